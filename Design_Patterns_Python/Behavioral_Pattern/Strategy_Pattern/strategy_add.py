@@ -0,0 +1,10 @@
+from strategy_interface import Strategy
+
+
+# // Concrete strategies implement the algorithm while following
+# // the base strategy interface. The interface makes them
+# // interchangeable in the context.
+class ConcreteStrategyAdd(Strategy):
+    def execute(self, a: int, b: int):
+        add_result = a + b
+        return add_result
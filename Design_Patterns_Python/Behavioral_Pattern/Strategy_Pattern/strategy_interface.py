@@ -0,0 +1,19 @@
+"""
+The strategy interface, in a module of its own so that the concrete strategy
+modules can be imported without importing the client application.
+"""
+
+from abc import ABC, abstractmethod
+
+
+# *******************************************
+# Strategy class
+# The strategy interface declares operations common to all
+# supported versions of some algorithm. The context uses this
+# interface to call the algorithm defined by the concrete
+# strategies.
+# *******************************************
+class Strategy(ABC):
+    @abstractmethod
+    def execute(self, a: int, b: int):
+        pass
@@ -0,0 +1,7 @@
+from strategy_interface import Strategy
+
+
+class ConcreteStrategyMultiply(Strategy):
+    def execute(self, a: int, b: int) -> int:
+        mult_result: int = a * b
+        return mult_result
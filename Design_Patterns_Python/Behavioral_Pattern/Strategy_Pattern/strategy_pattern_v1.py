@@ -6,41 +6,13 @@ their objects interchangeable.
 *******************************************************************************
 """
 
-from abc import ABC, abstractmethod
+import os
 
+from strategy_interface import Strategy
+from strategy_registry import StrategyRegistry
 
-# *******************************************
-# Strategy class
-# The strategy interface declares operations common to all
-# supported versions of some algorithm. The context uses this
-# interface to call the algorithm defined by the concrete
-# strategies.
-# *******************************************
-class Strategy(ABC):
-    @abstractmethod
-    def execute(self, a: int, b: int):
-        pass
-
-
-# // Concrete strategies implement the algorithm while following
-# // the base strategy interface. The interface makes them
-# // interchangeable in the context.
-class ConcreteStrategyAdd(Strategy):
-    def execute(self, a: int, b: int):
-        add_result = a + b
-        return add_result
-
-
-class ConcreteStrategySubtract(Strategy):
-    def execute(self, a: int, b: int):
-        sub_result = a - b
-        return sub_result
-
-
-class ConcreteStrategyMultiply(Strategy):
-    def execute(self, a: int, b: int) -> int:
-        mult_result: int = a * b
-        return mult_result
+# The concrete strategies live in modules of their own, listed in the manifest.
+MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "strategy_manifest.json")
 
 
 # *******************************************
@@ -69,30 +41,26 @@ class Context:
 # // the context. The client should be aware of the differences
 # // between strategies in order to make the right choice.
 def main():
+    registry = StrategyRegistry()
+    registry.load_manifest(MANIFEST_PATH)
+    registry.discover_entry_points()
+
     a = int(input("Enter first number:"))
     b = int(input("Enter second number:"))
 
     print("\nPlease select from the following options:")
-    print("Addition\t : 1")
-    print("Subtraction\t : 2")
-    print("Multiplication\t : 3")
-    selected_strategy: int = int(input("Enter strategy number:"))
-
-    context = Context()
-    if selected_strategy == 1:
-        concreteStrategyAdd = ConcreteStrategyAdd()
-        context.set_strategy(concreteStrategyAdd)
-
-    elif  selected_strategy == 2:
-        concreteStrategySubtract = ConcreteStrategySubtract()
-        context.set_strategy(concreteStrategySubtract)
+    for strategy_name in registry.names():
+        print(strategy_name)
+    selected_strategy: str = input("Enter strategy name:")
 
-    elif selected_strategy == 3:
-        concreteStrategyMultiply = ConcreteStrategyMultiply()
-        context.set_strategy(concreteStrategyMultiply)
+    # // Selecting a strategy is a single lookup, and only the selected
+    # // strategy's module gets imported.
+    if selected_strategy not in registry:
+        print(f"There no available execution for {selected_strategy}")
+        return
 
-    else:
-        print("There no available execution for {}", selected_strategy)
+    context = Context()
+    context.set_strategy(registry.create(selected_strategy))
 
     client_result = context.execute_strategy(a, b)
     print(client_result)
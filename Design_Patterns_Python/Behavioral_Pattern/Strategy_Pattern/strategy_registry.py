@@ -0,0 +1,102 @@
+"""
+*******************************************************************************
+A strategy registry maps a strategy name to the location of its concrete
+strategy class ("module:ClassName") without importing it. Strategies are
+discovered from a JSON manifest or from installed package entry points, and
+a strategy module is only imported the first time that strategy is selected.
+
+This keeps process startup flat no matter how many (heavy) strategies are
+available, and selecting a strategy is a single dictionary lookup.
+*******************************************************************************
+"""
+from __future__ import annotations
+
+import json
+from importlib import import_module
+from importlib.metadata import entry_points
+from typing import Any, Dict, List
+
+ENTRY_POINT_GROUP = "design_patterns.strategies"
+
+
+class StrategyRegistry:
+    """
+    The registry stores only the import target of every strategy. The class
+    itself is resolved lazily and cached, so the import cost is paid once and
+    only for the strategies that are actually used.
+    """
+
+    def __init__(self) -> None:
+        self._targets: Dict[str, str] = {}
+        self._loaded: Dict[str, type] = {}
+
+    def register(self, name: str, target: str) -> None:
+        """
+        Register a strategy under `name`. The target has the same
+        "package.module:ClassName" form as an entry point value.
+        """
+        if ":" not in target:
+            raise ValueError(f"Strategy target {target} must look like 'module:ClassName'")
+        self._targets[name] = target
+        self._loaded.pop(name, None)
+
+    def load_manifest(self, path: str) -> None:
+        """
+        Register every strategy listed in a JSON manifest, which is a plain
+        object of {"name": "module:ClassName"} pairs.
+        """
+        with open(path, encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+        for name, target in manifest.items():
+            self.register(name, target)
+
+    def discover_entry_points(self, group: str = ENTRY_POINT_GROUP) -> None:
+        """
+        Register the strategies that installed packages advertise in the given
+        entry point group. Only the metadata is read, nothing is imported.
+        """
+        for entry_point in entry_points(group=group):
+            self.register(entry_point.name, entry_point.value)
+
+    def names(self) -> List[str]:
+        return list(self._targets)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._targets
+
+    def get(self, name: str) -> type:
+        """
+        Return the strategy class registered under `name`, importing its
+        module on first use.
+        """
+        strategy_class = self._loaded.get(name)
+        if strategy_class is None:
+            try:
+                target = self._targets[name]
+            except KeyError:
+                raise KeyError(f"Strategy {name} is not registered") from None
+            module_name, _, class_name = target.partition(":")
+            strategy_class = getattr(import_module(module_name), class_name)
+            self._loaded[name] = strategy_class
+        return strategy_class
+
+    def create(self, name: str, *args: Any, **kwargs: Any) -> Any:
+        """
+        Instantiate the strategy registered under `name`.
+        """
+        return self.get(name)(*args, **kwargs)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+
+if __name__ == "__main__":
+    registry = StrategyRegistry()
+    registry.register("add", "strategy_add:ConcreteStrategyAdd")
+    registry.register("multiply", "strategy_multiply:ConcreteStrategyMultiply")
+    registry.discover_entry_points()
+
+    print(f"Registered strategies: {registry.names()}")
+    print(f"'add' loaded before selection: {registry.is_loaded('add')}")
+    print(f"add(2, 3) = {registry.create('add').execute(2, 3)}")
+    print(f"'add' loaded after selection: {registry.is_loaded('add')}")
@@ -0,0 +1,7 @@
+from strategy_interface import Strategy
+
+
+class ConcreteStrategySubtract(Strategy):
+    def execute(self, a: int, b: int):
+        sub_result = a - b
+        return sub_result
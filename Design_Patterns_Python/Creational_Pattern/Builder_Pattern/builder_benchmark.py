@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+"""
+Benchmark of step-by-step Director builds against compiled recipe replays.
+
+    python builder_benchmark.py [products] [repeat]
+"""
+
+import statistics
+import sys
+import timeit
+from typing import Callable, List
+
+from builder_pattern1 import ConcreteBuilder1, Director
+from builder_recipe import Recipe
+
+
+def measure(label: str, build: Callable[[], None], reset: Callable[[], None], products: int,
+            repeat: int) -> List[float]:
+    """
+    Time `products` builds `repeat` times and return the run times. The best
+    run, the one least disturbed by the rest of the machine, is reported with
+    the median and the spread of the runs. The builder is reset before every
+    run rather than inside the timed loop, so a run measures building alone.
+    """
+    runs: List[float] = timeit.Timer(build, setup=reset).repeat(repeat, products)
+    best = min(runs)
+    spread = (max(runs) - best) / best
+    print(f"{label:<32} best {best:8.3f} s  median {statistics.median(runs):8.3f} s  spread {spread:6.1%}  "
+          f"{products / best:14,.0f} products/s")
+    return runs
+
+
+def main(products: int = 200_000, repeat: int = 7) -> None:
+    builder = ConcreteBuilder1()
+    director = Director()
+    director.builder = builder
+    replay = Recipe.record(Director.build_full_featured_product).compile(ConcreteBuilder1)
+
+    baseline = measure("Director step-by-step", director.build_full_featured_product, builder.reset, products,
+                       repeat)
+    optimized = measure("compiled recipe", lambda: replay(builder), builder.reset, products, repeat)
+    print(f"speed-up: {min(baseline) / min(optimized):.2f}x best runs, "
+          f"{statistics.median(baseline) / statistics.median(optimized):.2f}x median runs")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from builder_pattern1 import Director, Product1
+
+"""
+When every building step is an independent, I/O-bound fetch, running the steps
+one after another wastes time. Here a step returns its part instead of adding it
+to the product, and declares which other parts it needs. The Director runs every
+step as soon as its dependencies are done, on a thread pool or on asyncio, and
+then assembles the product in the order the steps are declared. Building takes
+as long as the slowest chain of dependent steps, not the sum of all steps.
+"""
+
+
+def part(name: str, depends_on: Iterable[str] = ()) -> Callable[[Callable], Callable]:
+    """
+    Mark a builder method as the step producing part `name`. The step is called
+    with the parts it depends on as keyword arguments and returns its own part.
+    """
+
+    def decorate(step: Callable) -> Callable:
+        step._part = (name, tuple(depends_on))
+        return step
+
+    return decorate
+
+
+class ConcurrentBuilder:
+    """
+    Base class for builders whose steps are declared with `@part`. Steps may be
+    plain methods or coroutine methods.
+    """
+
+    @classmethod
+    def steps(cls) -> Dict[str, Tuple[str, Tuple[str, ...]]]:
+        """
+        Part name -> (method name, dependencies), in declaration order.
+        """
+        steps: Dict[str, Tuple[str, Tuple[str, ...]]] = {}
+        for klass in reversed(cls.__mro__):
+            for attribute, value in vars(klass).items():
+                if hasattr(value, "_part"):
+                    name, depends_on = value._part
+                    steps[name] = (attribute, depends_on)
+        return steps
+
+    def plan(self, parts: Optional[Iterable[str]] = None) -> Dict[str, Tuple[str, ...]]:
+        """
+        The requested parts (all by default) and everything they depend on,
+        in declaration order, each with its dependencies.
+        """
+        steps = self.steps()
+        selected: Dict[str, Tuple[str, ...]] = {}
+        visiting = set()
+
+        def visit(name: str) -> None:
+            if name in selected:
+                return
+            if name in visiting:
+                raise ValueError(f"Part dependency cycle through {name}")
+            if name not in steps:
+                raise KeyError(f"{type(self).__name__} has no step for part {name}")
+            visiting.add(name)
+            for dependency in steps[name][1]:
+                visit(dependency)
+            selected[name] = steps[name][1]
+
+        for name in (steps if parts is None else parts):
+            visit(name)
+        return {name: selected[name] for name in steps if name in selected}
+
+    def run_step(self, name: str, parts: Dict[str, Any]) -> Any:
+        method_name, depends_on = self.steps()[name]
+        return getattr(self, method_name)(**{dependency: parts[dependency] for dependency in depends_on})
+
+    def assemble(self, parts: Dict[str, Any]) -> Product1:
+        product = Product1()
+        for value in parts.values():
+            product.add(value)
+        return product
+
+
+class ConcurrentDirector(Director):
+    def __init__(self, max_workers: int = 8) -> None:
+        super().__init__()
+        self._max_workers = max_workers
+
+    def build_concurrently(self, parts: Optional[Iterable[str]] = None) -> Product1:
+        """
+        Run the steps on a thread pool. Every step is submitted as soon as the
+        last of its dependencies has finished.
+        """
+        builder_instance: ConcurrentBuilder = self.builder
+        pending = {name: set(depends_on) for name, depends_on in builder_instance.plan(parts).items()}
+        order = list(pending)
+        results: Dict[str, Any] = {}
+        running: Dict[Future, str] = {}
+        with ThreadPoolExecutor(self._max_workers) as executor:
+            while pending or running:
+                for name in [name for name, depends_on in pending.items() if not depends_on]:
+                    del pending[name]
+                    running[executor.submit(builder_instance.run_step, name, results)] = name
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    results[name] = future.result()
+                    if asyncio.iscoroutine(results[name]):
+                        results[name].close()
+                        raise TypeError(f"Step for part {name} is a coroutine, use build_async instead")
+                    for depends_on in pending.values():
+                        depends_on.discard(name)
+        return builder_instance.assemble({name: results[name] for name in order})
+
+    async def build_async(self, parts: Optional[Iterable[str]] = None) -> Product1:
+        """
+        Run the steps as asyncio tasks. Coroutine steps run on the event loop,
+        plain steps in the default thread pool.
+        """
+        builder_instance: ConcurrentBuilder = self.builder
+        plan = builder_instance.plan(parts)
+        results: Dict[str, Any] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run(name: str) -> Any:
+            await asyncio.gather(*(tasks[dependency] for dependency in plan[name]))
+            if asyncio.iscoroutinefunction(getattr(builder_instance, builder_instance.steps()[name][0])):
+                results[name] = await builder_instance.run_step(name, results)
+            else:
+                results[name] = await asyncio.to_thread(builder_instance.run_step, name, results)
+            return results[name]
+
+        # The plan is in dependency order, so every dependency task exists
+        # before the tasks waiting on it are created.
+        for name in plan:
+            tasks[name] = asyncio.ensure_future(run(name))
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+        return builder_instance.assemble({name: results[name] for name in plan})
+
+
+class ConcreteConcurrentBuilder1(ConcurrentBuilder):
+    """
+    Every step stands for a remote fetch. Part B needs part A, part C is
+    independent, so the critical path is max(A + B, C).
+    """
+
+    @part("A")
+    def produce_part_a(self) -> str:
+        time.sleep(0.2)
+        return "PartA1"
+
+    @part("B", depends_on=("A",))
+    def produce_part_b(self, A: str) -> str:
+        time.sleep(0.1)
+        return "PartB1"
+
+    @part("C")
+    async def produce_part_c(self) -> str:
+        await asyncio.sleep(0.25)
+        return "PartC1"
+
+
+class ThreadedConcreteBuilder1(ConcreteConcurrentBuilder1):
+    @part("C")
+    def produce_part_c(self) -> str:
+        time.sleep(0.25)
+        return "PartC1"
+
+
+if __name__ == "__main__":
+    director = ConcurrentDirector()
+
+    director.builder = ThreadedConcreteBuilder1()
+    start = time.perf_counter()
+    director.build_concurrently().list_parts()
+    print(f"  (thread pool, {time.perf_counter() - start:.2f} s instead of 0.55 s)")
+
+    director.builder = ConcreteConcurrentBuilder1()
+    start = time.perf_counter()
+    asyncio.run(director.build_async()).list_parts()
+    print(f"  (asyncio, {time.perf_counter() - start:.2f} s instead of 0.55 s)")
+
+    director.build_concurrently(["B"]).list_parts()
+    print("  (only part B and its dependency)")
@@ -1,6 +1,7 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import Any
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 """
 Builder is a creational design pattern, which allows constructing complex objects step by step.
@@ -48,8 +49,12 @@ class ConcreteBuilder1(Builder):
         self._product = None
         self.reset()
 
-    def reset(self) -> None:
-        self._product = Product1()
+    def reset(self, product: Optional[Product1] = None) -> None:
+        """
+        Start a blank product, or continue from a given one (e.g. a clone of a
+        cached prototype).
+        """
+        self._product = Product1() if product is None else product
 
     # All production steps work with the same product instance.
     @property
@@ -95,13 +100,129 @@ class Product1:
     """
 
     def __init__(self) -> None:
-        self.parts = []
+        self._parts: Union[List[Any], Tuple[Any, ...]] = []
+
+    @property
+    def parts(self) -> List[Any]:
+        # A clone shares an immutable tuple of parts with its original; the
+        # caller may modify the returned list, so it gets its own copy first.
+        if isinstance(self._parts, tuple):
+            self._parts = list(self._parts)
+        return self._parts
+
+    @parts.setter
+    def parts(self, parts: List[Any]) -> None:
+        self._parts = parts
 
     def add(self, part: Any) -> None:
         self.parts.append(part)
 
+    def clone(self) -> Product1:
+        """
+        Copy-on-write clone: the original and the clone share one tuple of
+        parts until either of them uses its `parts`. A `parts` list obtained
+        from the original before cloning no longer belongs to it.
+        """
+        if not isinstance(self._parts, tuple):
+            self._parts = tuple(self._parts)
+        clone = Product1.__new__(Product1)
+        clone._parts = self._parts
+        return clone
+
     def list_parts(self) -> None:
-        print(f"Product parts: {', '.join(self.parts)}", end="")
+        print(f"Product parts: {', '.join(self._parts)}", end="")
+
+
+class ProductStore:
+    """
+    A columnar store for many products. Instead of one Product1 object with its
+    own `parts` list per product, every distinct part is interned once and the
+    products are kept as a flat array of part IDs plus an array of offsets.
+    Product `i` consists of `part_ids[offsets[i]:offsets[i + 1]]`.
+    """
+
+    def __init__(self) -> None:
+        self.part_names: List[Any] = []
+        self._part_lookup: Dict[Any, int] = {}
+        self.part_ids = array("I")
+        self.offsets = array("Q", [0])
+
+    def intern(self, part: Any) -> int:
+        part_id = self._part_lookup.get(part)
+        if part_id is None:
+            part_id = len(self.part_names)
+            self._part_lookup[part] = part_id
+            self.part_names.append(part)
+        return part_id
+
+    def add_part(self, part: Any) -> None:
+        self.part_ids.append(self.intern(part))
+
+    def end_product(self) -> int:
+        """
+        Close the product made of the parts added since the previous one and
+        return its index.
+        """
+        self.offsets.append(len(self.part_ids))
+        return len(self.offsets) - 2
+
+    def discard_pending(self) -> None:
+        del self.part_ids[self.offsets[-1]:]
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def parts(self, index: int) -> List[Any]:
+        names = self.part_names
+        return [names[part_id] for part_id in self.part_ids[self.offsets[index]:self.offsets[index + 1]]]
+
+    def product(self, index: int) -> Product1:
+        """
+        Materialize a single product when a caller needs a real object.
+        """
+        product = Product1()
+        product.parts = self.parts(index)
+        return product
+
+
+class ColumnarBuilder1(Builder):
+    """
+    Builds the same products as ConcreteBuilder1, but appends interned part IDs
+    to a ProductStore instead of allocating a Product1 per product. The part IDs
+    are interned once when the builder is bound to a store.
+    """
+
+    def __init__(self, store: ProductStore) -> None:
+        self._store = None
+        self.store = store
+
+    @property
+    def store(self) -> ProductStore:
+        return self._store
+
+    @store.setter
+    def store(self, store: ProductStore) -> None:
+        self._store = store
+        self._part_ids = store.part_ids
+        self._part_a = store.intern("PartA1")
+        self._part_b = store.intern("PartB1")
+        self._part_c = store.intern("PartC1")
+
+    @property
+    def product(self) -> int:
+        """
+        return: the index of the finished product in the store
+        """
+        return self._store.end_product()
+
+    def produce_part_a(self) -> None:
+        self._part_ids.append(self._part_a)
+
+    def produce_part_b(self) -> None:
+        self._part_ids.append(self._part_b)
+
+    def produce_part_c(self) -> None:
+        self._part_ids.append(self._part_c)
 
 
 class Director:
@@ -114,6 +235,8 @@ class Director:
 
     def __init__(self) -> None:
         self._builder = None
+        self._columnar_builders: List[ColumnarBuilder1] = []
+        self._prototypes: Dict[Any, Product1] = {}
 
     @property
     def builder(self) -> Builder:
@@ -143,3 +266,56 @@ class Director:
         self.builder.produce_part_a()
         self.builder.produce_part_b()
         self.builder.produce_part_c()
+
+    def build_batch(self, recipe: Callable[[Director], None], count: int,
+                    store: Optional[ProductStore] = None) -> ProductStore:
+        """
+        Build `count` products with one of the recipes above, e.g.
+        `director.build_batch(Director.build_full_featured_product, 1_000_000)`.
+
+        The products are written into a columnar ProductStore instead of being
+        returned as separate objects, and the columnar builders are pooled and
+        reused by later batches. The current builder is left untouched.
+        - return: the store holding the new products
+        """
+        if store is None:
+            store = ProductStore()
+        if self._columnar_builders:
+            builder_instance = self._columnar_builders.pop()
+            builder_instance.store = store
+        else:
+            builder_instance = ColumnarBuilder1(store)
+
+        previous_builder = self._builder
+        self._builder = builder_instance
+        try:
+            for _ in range(count):
+                recipe(self)
+                builder_instance.product
+        finally:
+            store.discard_pending()
+            self._builder = previous_builder
+            self._columnar_builders.append(builder_instance)
+        return store
+
+    def build_from_prototype(self, recipe: Callable[[Director], None]) -> None:
+        """
+        Like calling `recipe(director)`, but the recipe only runs the first
+        time for each builder class. Its product is cached as a prototype and
+        every later call loads a copy-on-write clone of it into the builder,
+        which stays cheap until the client adds more parts to it.
+
+        Any product the builder had in progress is discarded. The builder must
+        accept a starting product in `reset`, as ConcreteBuilder1 does.
+        """
+        key = (type(self._builder), recipe)
+        prototype = self._prototypes.get(key)
+        if prototype is None:
+            self._builder.reset()
+            recipe(self)
+            prototype = self._builder.product
+            self._prototypes[key] = prototype
+        self._builder.reset(prototype.clone())
+
+    def clear_prototypes(self) -> None:
+        self._prototypes.clear()
@@ -27,3 +27,22 @@ if __name__ == "__main__":
     builder.produce_part_a()
     builder.produce_part_b()
     builder.product.list_parts()
+
+    print("\n")
+
+    # Standard products can be served from a cached prototype.
+    print("cached full featured product, customized")
+    director.build_from_prototype(Director.build_full_featured_product)
+    builder.produce_part_a()
+    builder.product.list_parts()
+    print()
+    director.build_from_prototype(Director.build_full_featured_product)
+    builder.product.list_parts()
+
+    print("\n")
+
+    # Large numbers of products can be built in one call into a columnar store.
+    print("batch of full featured products")
+    store = director.build_batch(Director.build_full_featured_product, 100_000)
+    print(f"{len(store)} products, {len(store.part_names)} distinct parts")
+    store.product(len(store) - 1).list_parts()
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Dict, List, Tuple
+
+from builder_pattern1 import ConcreteBuilder1, Director
+
+"""
+A Recipe is a recorded sequence of builder steps with their arguments. It can be
+saved as JSON and loaded in another process, and compiled into one specialized
+function per concrete builder class.
+
+The compiled function calls the builder class's step methods directly, one
+after another, without going through the Director's `builder` property or looking
+up every `produce_part_*` method on each call.
+"""
+
+Step = Tuple[str, Tuple[Any, ...], Dict[str, Any]]
+
+
+class _RecordingBuilder:
+    """
+    Stands in for a real builder while a recipe is recorded and remembers
+    every step that is called on it.
+    """
+
+    def __init__(self) -> None:
+        self.steps: List[Step] = []
+
+    def __getattr__(self, name: str) -> Callable[..., None]:
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def record(*args: Any, **kwargs: Any) -> None:
+            self.steps.append((name, args, kwargs))
+
+        return record
+
+
+class Recipe:
+    def __init__(self, steps: List[Step]) -> None:
+        self.steps = [(name, tuple(args), dict(kwargs)) for name, args, kwargs in steps]
+        self._compiled: Dict[type, Callable[[Any], None]] = {}
+
+    @classmethod
+    def record(cls, recipe: Callable[[Director], None]) -> Recipe:
+        """
+        Record a Director recipe, e.g. `Recipe.record(Director.build_full_featured_product)`.
+        """
+        director = Director()
+        recorder = _RecordingBuilder()
+        director.builder = recorder
+        recipe(director)
+        return cls(recorder.steps)
+
+    def to_json(self) -> str:
+        return json.dumps({"steps": [{"step": name, "args": list(args), "kwargs": kwargs}
+                                     for name, args, kwargs in self.steps]})
+
+    @classmethod
+    def from_json(cls, text: str) -> Recipe:
+        return cls([(step["step"], step.get("args", ()), step.get("kwargs", {}))
+                    for step in json.loads(text)["steps"]])
+
+    def compile(self, builder_class: type) -> Callable[[Any], None]:
+        """
+        Return a function that replays the recipe on an instance of
+        `builder_class`. The function is generated once per builder class as
+        straight-line code, with every step method bound as a default argument.
+        """
+        compiled = self._compiled.get(builder_class)
+        if compiled is not None:
+            return compiled
+
+        names: Dict[str, Any] = {}
+        parameters = []
+        body = []
+        for index, (name, args, kwargs) in enumerate(self.steps):
+            # A recipe may come from a file, so only public builder steps may run.
+            method = getattr(builder_class, name, None) if not name.startswith("_") else None
+            if not callable(method):
+                raise AttributeError(f"{builder_class.__name__} has no building step {name}")
+            parameters.append(f"_step{index}=_names['step{index}']")
+            names[f"step{index}"] = method
+            call = ["builder"]
+            if args:
+                names[f"args{index}"] = args
+                parameters.append(f"_args{index}=_names['args{index}']")
+                call.append(f"*_args{index}")
+            if kwargs:
+                names[f"kwargs{index}"] = kwargs
+                parameters.append(f"_kwargs{index}=_names['kwargs{index}']")
+                call.append(f"**_kwargs{index}")
+            body.append(f"    _step{index}({', '.join(call)})")
+
+        source = f"def replay(builder, {', '.join(parameters)}):\n" + ("\n".join(body) or "    pass") + "\n"
+        namespace: Dict[str, Any] = {"_names": names}
+        exec(compile(source, f"<recipe for {builder_class.__name__}>", "exec"), namespace)
+        compiled = namespace["replay"]
+        self._compiled[builder_class] = compiled
+        return compiled
+
+    def replay(self, builder_instance: Any) -> None:
+        self.compile(type(builder_instance))(builder_instance)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Compiled functions can't be pickled; the receiving process compiles again.
+        return {"steps": self.steps}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["steps"])
+
+
+if __name__ == "__main__":
+    full_featured = Recipe.record(Director.build_full_featured_product)
+    text = full_featured.to_json()
+    print(f"Recorded recipe: {text}")
+
+    builder = ConcreteBuilder1()
+    Recipe.from_json(text).replay(builder)
+    builder.product.list_parts()
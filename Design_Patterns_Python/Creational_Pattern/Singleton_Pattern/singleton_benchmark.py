@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+"""
+Contention benchmark for the singleton metaclasses.
+
+Many threads hammer `SomeSingleton()` after the instance already exists, which
+is the steady state of a real application. `SingletonMetha` takes its global
+lock on every call, `ScopedSingletonMeta` only reads an attribute.
+
+    python singleton_benchmark.py [threads] [calls_per_thread]
+"""
+
+import sys
+import time
+from threading import Barrier, Thread
+
+from singleton_pattern2 import SingletonMetha
+from singleton_pattern3 import ScopedSingletonMeta
+
+
+class LockedSingleton(metaclass=SingletonMetha):
+    pass
+
+
+class OtherLockedSingleton(metaclass=SingletonMetha):
+    pass
+
+
+class ScopedSingleton(metaclass=ScopedSingletonMeta):
+    pass
+
+
+class OtherScopedSingleton(metaclass=ScopedSingletonMeta):
+    pass
+
+
+def run(singleton_classes, threads: int, calls: int) -> float:
+    """
+    Return the wall time for `threads` threads to each make `calls` calls,
+    alternating over `singleton_classes` to include cross-class contention.
+    """
+    barrier = Barrier(threads + 1)
+
+    def worker(singleton_class) -> None:
+        barrier.wait()
+        for _ in range(calls):
+            singleton_class()
+
+    workers = [Thread(target=worker, args=(singleton_classes[i % len(singleton_classes)],))
+               for i in range(threads)]
+    for worker_thread in workers:
+        worker_thread.start()
+    start = time.perf_counter()
+    barrier.wait()
+    for worker_thread in workers:
+        worker_thread.join()
+    return time.perf_counter() - start
+
+
+def main(threads: int = 64, calls: int = 20_000) -> None:
+    print(f"{threads} threads x {calls} calls")
+    for label, classes in (("SingletonMetha (global lock)", (LockedSingleton, OtherLockedSingleton)),
+                           ("ScopedSingletonMeta (lock-free)", (ScopedSingleton, OtherScopedSingleton))):
+        elapsed = run(classes, threads, calls)
+        rate = threads * calls / elapsed
+        print(f"{label:<34} {elapsed:8.3f} s  {rate:14,.0f} calls/s")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -13,6 +13,10 @@ Most of the time, this limitation comes up during the creation of unit tests.
 
 """
 
+from threading import Lock
+from typing import Any, Tuple
+
+
 class SingletonMeta(type):
     """
     The SingletonMeta class is a metaclass that creates a Singleton base class when called
@@ -23,6 +27,17 @@ class SingletonMeta(type):
     """
 
     _instances = {}
+    _registry = []
+    """
+    Every class created with this metaclass, in definition order. It lets
+    startup code find and eagerly build singletons before they are first used.
+    """
+
+    def __init__(cls, name, bases, namespace) -> None:
+        super().__init__(name, bases, namespace)
+        # One lock per class, so building one singleton never waits for another.
+        cls._instance_lock = Lock()
+        SingletonMeta._registry.append(cls)
 
     def __call__(cls, *args, **kwargs) -> SingletonMeta:
         """
@@ -33,9 +48,23 @@ class SingletonMeta(type):
         :param kwargs:
         :return:
         """
-        if cls not in cls._instances:
-            cls._instances[cls] = super().__call__(*args, **kwargs)
-        return cls._instances[cls]
+        return cls._get_or_create(*args, **kwargs)[0]
+
+    def _get_or_create(cls, *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        The instance, and whether this call created it. Double-checked
+        locking: threads asking while it is being built wait for that single
+        construction instead of starting their own.
+        """
+        instance = cls._instances.get(cls)
+        if instance is not None:
+            return instance, False
+        with cls._instance_lock:
+            instance = cls._instances.get(cls)
+            if instance is not None:
+                return instance, False
+            instance = cls._instances[cls] = super().__call__(*args, **kwargs)
+            return instance, True
 
 
 class Singleton(metaclass=SingletonMeta):
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+"""
+Singleton is a creational design pattern, which ensures that only one object of its kind exists
+and provides a single point of access to it for any other code.
+
+This variant keeps the thread-safety of `SingletonMetha` but removes its global lock
+from the hot path. Once the instance exists, getting it is a plain attribute read.
+Every class has its own lock, so unrelated singletons never wait for each other,
+and all instances and locks are reset in the child process after `os.fork`.
+
+A singleton can also be scoped to the whole process, to a thread or to a
+`contextvars` context (e.g. one instance per asyncio task).
+"""
+
+import os
+from contextvars import ContextVar
+from enum import Enum
+from threading import Lock, Thread, local
+from typing import List
+from weakref import WeakSet
+
+
+class Scope(Enum):
+    PROCESS = "process"
+    THREAD = "thread"
+    CONTEXT = "context"
+
+
+class ScopedSingletonMeta(type):
+    """
+    The scope is chosen with a class keyword:
+
+        class Settings(metaclass=ScopedSingletonMeta, scope=Scope.THREAD):
+            ...
+    """
+
+    _registry: WeakSet = WeakSet()
+
+    def __new__(mcs, name, bases, namespace, scope: Scope = Scope.PROCESS, **kwargs):
+        return super().__new__(mcs, name, bases, namespace, **kwargs)
+
+    def __init__(cls, name, bases, namespace, scope: Scope = Scope.PROCESS, **kwargs) -> None:
+        super().__init__(name, bases, namespace, **kwargs)
+        cls._scope = scope
+        cls._reset_state()
+        ScopedSingletonMeta._registry.add(cls)
+
+    def _reset_state(cls) -> None:
+        """
+        Every class gets its own lock and storage, so the first construction of
+        one singleton never blocks callers of another one.
+        """
+        cls._instance = None
+        cls._instance_lock = Lock()
+        cls._thread_instances = local()
+        cls._context_instance = ContextVar(f"{cls.__qualname__}_instance", default=None)
+
+    def __call__(cls, *args, **kwargs):
+        """
+        Possible changes to the value of the `__init__` argument do not affect
+        the returned instance.
+        """
+        if cls._scope is Scope.PROCESS:
+            """
+            Fast path: once the instance is published, no lock is taken at all.
+            Only the threads racing on the very first call fall through to the
+            double-checked locking below.
+            """
+            instance = cls._instance
+            if instance is not None:
+                return instance
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = super().__call__(*args, **kwargs)
+                return cls._instance
+
+        if cls._scope is Scope.THREAD:
+            # No other thread can see this storage, so no lock is needed.
+            instance = getattr(cls._thread_instances, "instance", None)
+            if instance is None:
+                instance = super().__call__(*args, **kwargs)
+                cls._thread_instances.instance = instance
+            return instance
+
+        instance = cls._context_instance.get()
+        if instance is None:
+            instance = super().__call__(*args, **kwargs)
+            cls._context_instance.set(instance)
+        return instance
+
+    def reset_instance(cls) -> None:
+        """
+        Drop the instance(s) of this class, e.g. between unit tests.
+        """
+        with cls._instance_lock:
+            cls._reset_state()
+
+
+def registered_singletons() -> List[type]:
+    return list(ScopedSingletonMeta._registry)
+
+
+def _reset_after_fork() -> None:
+    """
+    A forked child inherits the parent's instances (with their sockets, pools and
+    threads that no longer exist) and possibly locks held by parent threads that
+    will never release them. Start from a clean state instead.
+    """
+    for cls in registered_singletons():
+        cls._reset_state()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class Singleton(metaclass=ScopedSingletonMeta):
+    value: str = None
+
+    def __init__(self, value: str) -> None:
+        self.value = value
+
+    def some_business_logic(self) -> None:
+        """
+        Finally, any singleton should define some business logic, which can be
+        executed on its instance.
+        """
+        pass
+
+
+class ThreadSingleton(metaclass=ScopedSingletonMeta, scope=Scope.THREAD):
+    value: str = None
+
+    def __init__(self, value: str) -> None:
+        self.value = value
+
+
+def test_singleton(value: str) -> None:
+    singleton = Singleton(value)
+    thread_singleton = ThreadSingleton(value)
+    print(f"process scope: {singleton.value}, thread scope: {thread_singleton.value}")
+
+
+if __name__ == "__main__":
+    # the client code
+    print("The process scoped value is shared by every thread,\n"
+          "the thread scoped value is different in each thread.\n\n"
+          "RESULT:\n")
+
+    threads = [Thread(target=test_singleton, args=(value,)) for value in ("FOO", "BAR", "WOO", "HOO")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
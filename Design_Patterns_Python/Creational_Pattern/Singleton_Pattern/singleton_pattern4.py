@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+"""
+Singleton is a creational design pattern, which ensures that only one object of its kind exists
+and provides a single point of access to it for any other code.
+
+Expensive singletons (connection pools, models, ...) usually need an asynchronous
+initialization, which `SingletonMeta`/`SingletonMetha` cannot express because
+`__init__` is synchronous. With this variant the first caller starts the
+initialization and every concurrent caller awaits the very same in-flight task,
+so the event loop is never blocked and no duplicate instance is ever created.
+If the initialization fails, all waiting callers get the error and the next
+caller starts a new attempt.
+"""
+
+import asyncio
+from typing import Optional
+
+
+class AsyncSingletonMeta(type):
+    """
+    Classes using this metaclass implement `async def initialize(self, ...)` and
+    are accessed with `await SomeSingleton.instance(...)`.
+    """
+
+    def __init__(cls, name, bases, namespace, **kwargs) -> None:
+        super().__init__(name, bases, namespace, **kwargs)
+        cls._instance = None
+        cls._init_task: Optional[asyncio.Task] = None
+
+    def __call__(cls, *args, **kwargs):
+        """
+        A synchronous call can only return an instance that is already
+        initialized, it never starts the initialization itself.
+        """
+        if cls._instance is None:
+            raise RuntimeError(f"{cls.__name__} is not initialized, use 'await {cls.__name__}.instance()'")
+        return cls._instance
+
+    async def instance(cls, *args, **kwargs):
+        """
+        Possible changes to the value of the arguments do not affect the
+        returned instance once the first initialization has started.
+        """
+        if cls._instance is not None:
+            return cls._instance
+
+        if cls._init_task is None:
+            cls._init_task = asyncio.ensure_future(cls._create(*args, **kwargs))
+
+        # A cancelled waiter must not cancel the initialization that the
+        # other waiters depend on.
+        return await asyncio.shield(cls._init_task)
+
+    async def _create(cls, *args, **kwargs):
+        try:
+            instance = super().__call__()
+            await instance.initialize(*args, **kwargs)
+        except BaseException:
+            cls._init_task = None
+            raise
+        cls._instance = instance
+        return instance
+
+    def reset_instance(cls) -> None:
+        cls._instance = None
+        cls._init_task = None
+
+
+class ConnectionPool(metaclass=AsyncSingletonMeta):
+    dsn: str = None
+    attempts: int = 0
+
+    async def initialize(self, dsn: str) -> None:
+        """
+        Stands for any slow, awaitable setup. The first attempt fails to show
+        that initialization can be retried.
+        """
+        ConnectionPool.attempts += 1
+        await asyncio.sleep(0.1)
+        if ConnectionPool.attempts == 1:
+            raise ConnectionError("database is not reachable yet")
+        self.dsn = dsn
+
+    def some_business_logic(self) -> None:
+        """
+        Finally, any singleton should define some business logic, which can be
+        executed on its instance.
+        """
+        pass
+
+
+async def main() -> None:
+    results = await asyncio.gather(*(ConnectionPool.instance(f"db-{i}") for i in range(3)),
+                                   return_exceptions=True)
+    print(f"First attempt, 3 concurrent callers: {results}")
+
+    pools = await asyncio.gather(*(ConnectionPool.instance(f"db-{i}") for i in range(3, 6)))
+    print(f"Retry, 3 concurrent callers share one instance: {len({id(pool) for pool in pools}) == 1}")
+    print(f"Initialized with {pools[0].dsn} after {ConnectionPool.attempts} attempts")
+    print(f"Synchronous access now works: {ConnectionPool() is pools[0]}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
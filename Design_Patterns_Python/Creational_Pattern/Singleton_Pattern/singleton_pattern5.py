@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+"""
+Singleton is a creational design pattern, which ensures that only one object of its kind exists
+and provides a single point of access to it for any other code.
+
+Sharing one expensive object between threads is fine until the object does real
+work; then every thread queues behind that one instance. In this variant the
+singleton is the pool: each class owns exactly one bounded pool of instances.
+Threads check an instance out, use it and return it, so throughput grows with
+the number of pooled instances instead of being serialized on a single one.
+"""
+
+import time
+from collections import deque
+from contextlib import contextmanager
+from threading import Condition, Lock, Thread
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+class ObjectPool:
+    """
+    A bounded pool that creates instances lazily, up to `max_size`. Instances
+    idle for longer than `idle_timeout` seconds are evicted, and instances that
+    fail the optional `health_check` are discarded instead of handed out.
+    A health check that raises counts as failed. Health checks and `dispose`
+    run outside the pool lock, so a slow probe only delays its own caller.
+    """
+
+    def __init__(self, factory: Callable[[], Any], max_size: int, idle_timeout: Optional[float] = None,
+                 health_check: Optional[Callable[[Any], bool]] = None,
+                 dispose: Optional[Callable[[Any], None]] = None) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._factory = factory
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._health_check = health_check
+        self._dispose = dispose
+        self._condition = Condition(Lock())
+        self._idle: deque = deque()
+        self._size = 0
+        self._in_use = 0
+
+        self._created_at = time.perf_counter()
+        self._last_change = self._created_at
+        self._busy_time = 0.0
+        self._checkouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def acquire(self, timeout: Optional[float] = None) -> Any:
+        """
+        Return an idle instance, create a new one while the pool may still grow,
+        or wait until another thread releases one.
+        """
+        start = time.perf_counter()
+        deadline = None if timeout is None else start + timeout
+        while True:
+            candidate = None
+            expired = []
+            try:
+                with self._condition:
+                    while True:
+                        expired += self._take_expired()
+                        if self._idle:
+                            # Most recently used first, so rarely needed instances age out.
+                            candidate, _ = self._idle.pop()
+                            break
+                        if self._size < self._max_size:
+                            self._size += 1
+                            self._checked_out(start)
+                            break
+
+                        remaining = None if deadline is None else deadline - time.perf_counter()
+                        if remaining is not None and remaining <= 0:
+                            raise TimeoutError(f"No pooled instance available after {timeout} s")
+                        self._condition.wait(remaining)
+            finally:
+                self._dispose_all(expired)
+
+            if candidate is None:
+                break
+            # The candidate still counts in `_size` while it is being checked.
+            if self._is_healthy(candidate):
+                with self._condition:
+                    self._checked_out(start)
+                return candidate
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            self._dispose_all([candidate])
+
+        # Construction is slow, so it happens outside the lock.
+        try:
+            return self._factory()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._account(time.perf_counter())
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, instance: Any) -> None:
+        with self._condition:
+            now = time.perf_counter()
+            self._account(now)
+            self._in_use -= 1
+            self._idle.append((instance, now))
+            self._condition.notify()
+
+    @contextmanager
+    def checkout(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        instance = self.acquire(timeout)
+        try:
+            yield instance
+        finally:
+            self.release(instance)
+
+    def evict_idle(self) -> None:
+        with self._condition:
+            expired = self._take_expired()
+        self._dispose_all(expired)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        `utilization` is the share of the pool capacity that was checked out
+        over the lifetime of the pool.
+        """
+        with self._condition:
+            now = time.perf_counter()
+            self._account(now)
+            elapsed = now - self._created_at
+            return {
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "avg_wait": self._total_wait / self._checkouts if self._checkouts else 0.0,
+                "max_wait": self._max_wait,
+                "utilization": self._busy_time / (self._max_size * elapsed) if elapsed else 0.0,
+            }
+
+    def _checked_out(self, start: float) -> None:
+        now = time.perf_counter()
+        self._account(now)
+        self._in_use += 1
+        wait = now - start
+        self._checkouts += 1
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+
+    def _account(self, now: float) -> None:
+        self._busy_time += self._in_use * (now - self._last_change)
+        self._last_change = now
+
+    def _take_expired(self) -> List[Any]:
+        """
+        Called with the lock held; the caller disposes of the returned
+        instances once it has released the lock.
+        """
+        expired: List[Any] = []
+        if self._idle_timeout is None:
+            return expired
+        expired_before = time.perf_counter() - self._idle_timeout
+        # The oldest idle instances are at the left end of the deque.
+        while self._idle and self._idle[0][1] < expired_before:
+            expired.append(self._idle.popleft()[0])
+            self._size -= 1
+            self._condition.notify()
+        return expired
+
+    def _is_healthy(self, instance: Any) -> bool:
+        if self._health_check is None:
+            return True
+        try:
+            return bool(self._health_check(instance))
+        except Exception:
+            return False
+
+    def _dispose_all(self, instances: List[Any]) -> None:
+        if self._dispose is None:
+            return
+        for instance in instances:
+            try:
+                self._dispose(instance)
+            except Exception:
+                # The instance has left the pool either way.
+                pass
+
+
+class PooledSingletonMeta(type):
+    """
+    The pool is the singleton: it is created once per class on first access,
+    with the same double-checked locking as `SingletonMetha`, but with a lock
+    per class. Calling the class itself still constructs a plain instance,
+    which is what the pool uses as its factory.
+
+        class Model(metaclass=PooledSingletonMeta, pool_size=8):
+            ...
+
+        with Model.checkout() as model:
+            model.predict(...)
+    """
+
+    def __new__(mcs, name, bases, namespace, **kwargs):
+        return super().__new__(mcs, name, bases, namespace)
+
+    def __init__(cls, name, bases, namespace, pool_size: int = 4, idle_timeout: Optional[float] = None,
+                 **kwargs) -> None:
+        super().__init__(name, bases, namespace)
+        cls._pool_size = pool_size
+        cls._idle_timeout = idle_timeout
+        cls._pool: Optional[ObjectPool] = None
+        cls._pool_lock = Lock()
+
+    def pool(cls, *args, **kwargs) -> ObjectPool:
+        """
+        Possible changes to the value of the arguments do not affect the pool
+        once it exists. They are passed to every pooled instance's `__init__`.
+        """
+        pool = cls._pool
+        if pool is None:
+            with cls._pool_lock:
+                if cls._pool is None:
+                    health_check = getattr(cls, "is_healthy", None)
+                    dispose = getattr(cls, "close", None)
+                    cls._pool = ObjectPool(lambda: cls(*args, **kwargs), cls._pool_size, cls._idle_timeout,
+                                           health_check, dispose)
+                pool = cls._pool
+        return pool
+
+    def checkout(cls, timeout: Optional[float] = None):
+        return cls.pool().checkout(timeout)
+
+
+class Singleton(metaclass=PooledSingletonMeta, pool_size=4, idle_timeout=30.0):
+    """
+    Pooled classes may define `is_healthy(self)` and `close(self)`; the pool
+    uses them as health check and for disposing evicted instances.
+    """
+
+    def __init__(self) -> None:
+        time.sleep(0.05)
+
+    def some_business_logic(self) -> None:
+        time.sleep(0.01)
+
+    def is_healthy(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        pass
+
+
+def test_singleton(requests: int) -> None:
+    for _ in range(requests):
+        with Singleton.checkout() as singleton:
+            singleton.some_business_logic()
+
+
+if __name__ == "__main__":
+    # the client code
+    start = time.perf_counter()
+    threads = [Thread(target=test_singleton, args=(10,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"80 requests on 8 threads took {time.perf_counter() - start:.2f} s")
+    for key, value in Singleton.pool().stats().items():
+        print(f"{key:<12}: {value:.3f}" if isinstance(value, float) else f"{key:<12}: {value}")
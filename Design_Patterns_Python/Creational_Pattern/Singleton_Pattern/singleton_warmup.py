@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+"""
+Background warm-up for the singletons created with `SingletonMeta`.
+
+Every singleton is normally built on first use, so the first request of a fresh
+worker pays for all of them. `warm_up` builds the chosen singletons eagerly on a
+thread pool at startup. A singleton declares the singletons it needs in a
+`depends_on` class attribute; it is only built after all of them, while
+independent singletons are built in parallel. The report shows how long each
+singleton took, so the one that dominates startup is easy to spot.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from threading import Event, Thread
+from typing import Dict, Iterable, List, Optional, Set
+
+from singleton_pattern1 import SingletonMeta
+
+
+def registered_singletons() -> List[type]:
+    return list(SingletonMeta._registry)
+
+
+class WarmUpResult:
+    def __init__(self, singleton_class: type, status: str, started: float = 0.0, duration: float = 0.0,
+                 error: Optional[BaseException] = None) -> None:
+        self.singleton_class = singleton_class
+        self.status = status
+        self.started = started
+        self.duration = duration
+        self.error = error
+
+
+class WarmUp:
+    """
+    Handle on a running warm-up. `wait()` blocks until every singleton is
+    built (or failed), `report()` lists the results slowest first.
+    """
+
+    def __init__(self, classes: Iterable[type], max_workers: int) -> None:
+        self._classes = _with_dependencies(classes)
+        self._max_workers = max_workers
+        self._results: Dict[type, WarmUpResult] = {}
+        self._done = Event()
+        self._start = time.perf_counter()
+        self._thread = Thread(target=self._run, name="singleton-warm-up", daemon=True)
+
+    def start(self) -> WarmUp:
+        self._thread.start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def report(self) -> List[WarmUpResult]:
+        return sorted(self._results.values(), key=lambda result: result.duration, reverse=True)
+
+    def format_report(self) -> str:
+        lines = [f"{'singleton':<24}{'status':<10}{'start (s)':>10}{'init (s)':>10}"]
+        for result in self.report():
+            lines.append(f"{result.singleton_class.__name__:<24}{result.status:<10}"
+                         f"{result.started:>10.3f}{result.duration:>10.3f}")
+        return "\n".join(lines)
+
+    def _run(self) -> None:
+        """
+        Kahn's algorithm on the dependency graph: a singleton is submitted as
+        soon as the last of its dependencies has been built.
+        """
+        pending = {cls: set(_dependencies(cls)) for cls in self._classes}
+        running: Dict[Future, type] = {}
+        try:
+            with ThreadPoolExecutor(self._max_workers, thread_name_prefix="singleton-warm-up") as executor:
+                while pending or running:
+                    for cls in [cls for cls, deps in pending.items() if not deps]:
+                        del pending[cls]
+                        running[executor.submit(self._build, cls)] = cls
+
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        cls = running.pop(future)
+                        self._results[cls] = future.result()
+                        if self._results[cls].status == "failed":
+                            self._skip_dependents(cls, pending)
+                        for deps in pending.values():
+                            deps.discard(cls)
+        finally:
+            self._done.set()
+
+    def _build(self, cls: type) -> WarmUpResult:
+        started = time.perf_counter() - self._start
+        try:
+            # Shares the construction with any request touching the class meanwhile.
+            _, created = cls._get_or_create()
+        except Exception as error:
+            return WarmUpResult(cls, "failed", started, time.perf_counter() - self._start - started, error)
+        return WarmUpResult(cls, "built" if created else "existing", started,
+                            time.perf_counter() - self._start - started)
+
+    def _skip_dependents(self, failed: type, pending: Dict[type, Set[type]]) -> None:
+        # A worklist rather than recursion: in a diamond, a class depends on
+        # the failed one through several paths but is skipped only once.
+        worklist = [failed]
+        while worklist:
+            skipped = worklist.pop()
+            for cls in [cls for cls, deps in pending.items() if skipped in deps]:
+                del pending[cls]
+                self._results[cls] = WarmUpResult(cls, "skipped")
+                worklist.append(cls)
+
+
+def _dependencies(cls: type) -> Iterable[type]:
+    return getattr(cls, "depends_on", ())
+
+
+def _with_dependencies(classes: Iterable[type]) -> List[type]:
+    """
+    Add the transitive dependencies of the chosen classes and reject cycles,
+    which could never finish warming up.
+    """
+    ordered: List[type] = []
+    visiting: Set[type] = set()
+
+    def visit(cls: type) -> None:
+        if cls in ordered:
+            return
+        if cls in visiting:
+            raise ValueError(f"Singleton dependency cycle through {cls.__name__}")
+        visiting.add(cls)
+        for dependency in _dependencies(cls):
+            visit(dependency)
+        visiting.discard(cls)
+        ordered.append(cls)
+
+    for singleton_class in classes:
+        visit(singleton_class)
+    return ordered
+
+
+def warm_up(classes: Optional[Iterable[type]] = None, max_workers: int = 4) -> WarmUp:
+    """
+    Start building `classes` (all registered singletons by default) in the
+    background and return immediately.
+    """
+    return WarmUp(registered_singletons() if classes is None else classes, max_workers).start()
+
+
+class Config(metaclass=SingletonMeta):
+    def __init__(self) -> None:
+        time.sleep(0.1)
+
+
+class Database(metaclass=SingletonMeta):
+    depends_on = (Config,)
+
+    def __init__(self) -> None:
+        time.sleep(0.3)
+
+
+class Model(metaclass=SingletonMeta):
+    depends_on = (Config,)
+
+    def __init__(self) -> None:
+        time.sleep(0.5)
+
+
+class Api(metaclass=SingletonMeta):
+    depends_on = (Database, Model)
+
+    def __init__(self) -> None:
+        time.sleep(0.05)
+
+
+if __name__ == "__main__":
+    # the client code
+    warm_up_handle = warm_up([Api])
+    print("Worker keeps starting up while singletons are built in the background...")
+    warm_up_handle.wait()
+    print(warm_up_handle.format_report())
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from threading import Event, Lock, Thread
+from typing import Any, Dict, Hashable, Optional
+
+from facade_pattern1 import Facade, Subsystem1, Subsystem2
+
+
+class _InFlight:
+    """
+    A subsystem round-trip that is still running. Callers asking for the same
+    request wait for it instead of starting their own.
+    """
+
+    def __init__(self) -> None:
+        self.done = Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+# create caching facade class
+class CachingFacade:
+    """
+    The CachingFacade wraps a Facade and offers the very same operations.
+    Responses are cached per operation and arguments, for a per-operation TTL,
+    and the least recently used entry is evicted once `max_entries` is reached.
+
+    Identical requests arriving while the first one is still running don't hit
+    the subsystems again: they wait for that single round-trip and share its
+    result (or its error; errors are not cached).
+    """
+
+    def __init__(self, facade_object: Facade, ttls: Optional[Dict[str, float]] = None,
+                 default_ttl: float = 1.0, max_entries: int = 1024) -> None:
+        self._facade = facade_object
+        self._ttls = ttls or {}
+        self._default_ttl = default_ttl
+        self._max_entries = max_entries
+        self._lock = Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._in_flight: Dict[Hashable, _InFlight] = {}
+        self._counters = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expirations": 0}
+
+    def __getattr__(self, name: str) -> Any:
+        """
+        Every public method of the wrapped Facade is available through the cache.
+        """
+        attribute = getattr(self._facade, name)
+        if name.startswith("_") or not callable(attribute):
+            return attribute
+
+        def cached_operation(*args: Any, **kwargs: Any) -> Any:
+            return self.call(name, *args, **kwargs)
+
+        return cached_operation
+
+    def call(self, name: str, *args: Any, **kwargs: Any) -> Any:
+        key = (name, args, tuple(sorted(kwargs.items())))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return result
+                del self._entries[key]
+                self._counters["expirations"] += 1
+
+            in_flight = self._in_flight.get(key)
+            leader = in_flight is None
+            if leader:
+                in_flight = self._in_flight[key] = _InFlight()
+                self._counters["misses"] += 1
+            else:
+                self._counters["coalesced"] += 1
+
+        if not leader:
+            in_flight.done.wait()
+            if in_flight.error is not None:
+                raise in_flight.error
+            return in_flight.result
+
+        try:
+            in_flight.result = getattr(self._facade, name)(*args, **kwargs)
+        except BaseException as error:
+            in_flight.error = error
+            raise
+        else:
+            self._store(key, self._ttls.get(name, self._default_ttl), in_flight.result)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            in_flight.done.set()
+        return in_flight.result
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == name]:
+                    del self._entries[key]
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats: Dict[str, float] = dict(self._counters)
+            stats["entries"] = len(self._entries)
+        requests = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = stats["hits"] / requests if requests else 0.0
+        stats["coalescing_rate"] = stats["coalesced"] / requests if requests else 0.0
+        return stats
+
+    def _store(self, key: Hashable, ttl: float, result: Any) -> None:
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+
+# A subsystem standing for a slow remote service.
+class RemoteSubsystem1(Subsystem1):
+    calls: int = 0
+
+    @staticmethod
+    def operation1() -> str:
+        RemoteSubsystem1.calls += 1
+        time.sleep(0.2)
+        return Subsystem1.operation1()
+
+
+def client_code(facade_object: Any) -> None:
+    facade_object.operation()
+
+
+if __name__ == "__main__":
+    cached_facade = CachingFacade(Facade(RemoteSubsystem1(), Subsystem2()), ttls={"operation": 5.0})
+
+    clients = [Thread(target=client_code, args=(cached_facade,)) for _ in range(50)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    client_code(cached_facade)
+
+    print(f"51 requests, {RemoteSubsystem1.calls} subsystem round-trip(s)")
+    print(cached_facade.stats())
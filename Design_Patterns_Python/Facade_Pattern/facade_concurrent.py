@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from typing import Callable, Dict, List, Optional, Tuple
+
+from facade_pattern1 import Facade, Subsystem1, Subsystem2
+
+
+class _CallStart(Event):
+    """
+    Set when a queued subsystem call starts running (or is done without
+    having run); `at` is when it started.
+    """
+    at: Optional[float] = None
+
+
+# create concurrent facade class
+class ConcurrentFacade(Facade):
+    """
+    When the subsystems are remote services, calling them one after another
+    adds their latencies up. Like `Facade.operation`, this Facade first
+    initializes the subsystems and then orders them to act, but within each of
+    the two phases it calls all subsystems at once, on a thread pool
+    (`operation`) or on asyncio (`operation_async`). Each phase then takes as
+    long as its slowest subsystem. The output is assembled in the same order
+    as `Facade.operation`.
+
+    Every subsystem may have its own timeout, counted from the moment its call
+    starts running, so time spent queued for a pool thread doesn't count.
+    Waiting for a thread is bounded by the same timeout, though: calls that
+    timed out keep their threads until they return, and a call that gets no
+    thread in time is reported as timed out as well. With
+    `partial_results`, a failed or timed out call is reported in the output
+    instead of failing the whole operation.
+    """
+
+    def __init__(self, subsystem1_object: Subsystem1, subsystem2_object: Subsystem2,
+                 timeouts: Optional[Dict[str, float]] = None, default_timeout: Optional[float] = None,
+                 partial_results: bool = False, max_workers: int = 4) -> None:
+        super().__init__(subsystem1_object, subsystem2_object)
+        self._timeouts = timeouts or {}
+        self._default_timeout = default_timeout
+        self._partial_results = partial_results
+        # Calls that time out keep running in the background, so the pool
+        # outlives a single operation.
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="facade")
+
+    def _phases(self) -> List[Tuple[str, List[Tuple[str, Callable[[], str]]]]]:
+        """
+        The layout of `Facade.operation`: the heading of every phase and its
+        (subsystem name, call) pairs.
+        """
+        return [("Facade initializes subsystems:",
+                 [("subsystem1", self._subsystem1.operation1), ("subsystem2", self._subsystem2.operation1)]),
+                ("Facade orders subsystems to perform the action:",
+                 [("subsystem1", self._subsystem1.operation_n), ("subsystem2", self._subsystem2.operation_z)])]
+
+    def operation(self) -> str:
+        results = []
+        for heading, calls in self._phases():
+            running = []
+            submitted = time.monotonic()
+            for subsystem, method in calls:
+                started = _CallStart()
+                future = self._executor.submit(self._timed_call, method, started)
+                future.add_done_callback(lambda _, started=started: started.set())
+                running.append((subsystem, started, future))
+
+            results.append(heading)
+            for subsystem, started, future in running:
+                timeout = self._timeout(subsystem)
+                if not started.wait(None if timeout is None else max(0.0, submitted + timeout - time.monotonic())):
+                    future.cancel()
+                    results.append(self._unavailable(subsystem, TimeoutError("no free thread")))
+                    continue
+                remaining = None
+                if timeout is not None and started.at is not None:
+                    remaining = max(0.0, started.at + timeout - time.monotonic())
+                try:
+                    results.append(future.result(remaining))
+                except Exception as error:
+                    future.cancel()
+                    results.append(self._unavailable(subsystem, error))
+        return "\n".join(results)
+
+    async def operation_async(self) -> str:
+        """
+        Coroutine subsystem methods are awaited on the event loop, plain ones
+        run in the default thread pool.
+        """
+
+        async def call(subsystem: str, method: Callable) -> str:
+            awaitable = method() if asyncio.iscoroutinefunction(method) else asyncio.to_thread(method)
+            try:
+                return await asyncio.wait_for(awaitable, self._timeout(subsystem))
+            except Exception as error:
+                return self._unavailable(subsystem, error)
+
+        results = []
+        for heading, calls in self._phases():
+            results.append(heading)
+            results += await asyncio.gather(*(call(subsystem, method) for subsystem, method in calls))
+        return "\n".join(results)
+
+    @classmethod
+    def _timed_call(cls, method: Callable, started: _CallStart) -> str:
+        started.at = time.monotonic()
+        started.set()
+        return cls._call(method)
+
+    @staticmethod
+    def _call(method: Callable) -> str:
+        # A worker thread has no event loop, so coroutine methods get their own.
+        if asyncio.iscoroutinefunction(method):
+            return asyncio.run(method())
+        return method()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _timeout(self, subsystem: str) -> Optional[float]:
+        return self._timeouts.get(subsystem, self._default_timeout)
+
+    def _unavailable(self, subsystem: str, error: Exception) -> str:
+        if not self._partial_results:
+            raise error
+        reason = "timed out" if isinstance(error, TimeoutError) else repr(error)
+        return f"{subsystem.capitalize()}: unavailable ({reason})"
+
+
+# Subsystems standing for remote services with some network latency.
+class RemoteSubsystem1(Subsystem1):
+    @staticmethod
+    def operation1() -> str:
+        time.sleep(0.2)
+        return Subsystem1.operation1()
+
+    @staticmethod
+    def operation_n() -> str:
+        time.sleep(0.2)
+        return Subsystem1.operation_n()
+
+
+class RemoteSubsystem2(Subsystem2):
+    @staticmethod
+    async def operation1() -> str:
+        await asyncio.sleep(0.2)
+        return Subsystem2.operation1()
+
+    @staticmethod
+    def operation_z() -> str:
+        time.sleep(0.5)
+        return Subsystem2.operation_z()
+
+
+if __name__ == "__main__":
+    facade_obj = ConcurrentFacade(RemoteSubsystem1(), RemoteSubsystem2(), timeouts={"subsystem1": 1.0})
+    start = time.perf_counter()
+    print(facade_obj.operation())
+    print(f"(thread pool, {time.perf_counter() - start:.2f} s)\n")
+    facade_obj.close()
+
+    async def timed_operation() -> None:
+        facade_async = ConcurrentFacade(RemoteSubsystem1(), RemoteSubsystem2(), timeouts={"subsystem2": 0.3},
+                                        partial_results=True)
+        start_async = time.perf_counter()
+        print(await facade_async.operation_async())
+        print(f"(asyncio with a 0.3 s timeout for subsystem2, {time.perf_counter() - start_async:.2f} s)")
+        facade_async.close()
+
+    asyncio.run(timed_operation())
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import time
+from contextlib import ExitStack, contextmanager
+from queue import Empty, LifoQueue
+from threading import Lock, Thread
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from facade_pattern1 import Facade, Subsystem1, Subsystem2
+
+
+class SubsystemProvider:
+    """
+    Creates a subsystem from its factory the first time it is needed.
+
+    A thread-safe subsystem is created once and shared. A subsystem that is not
+    thread-safe is pooled instead: each caller gets an instance of its own for
+    the duration of the call, and at most `pool_size` instances are created.
+    """
+
+    def __init__(self, factory: Callable[[], Any], thread_safe: bool = True, pool_size: int = 4,
+                 timeout: Optional[float] = None) -> None:
+        self._factory = factory
+        self._thread_safe = thread_safe
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._lock = Lock()
+        self._shared: Any = None
+        self._idle: LifoQueue = LifoQueue()
+        self._created: List[Any] = []
+        # id of an instance -> number of callers using it right now
+        self._leases: Dict[int, int] = {}
+        self._closed = False
+
+    @property
+    def created(self) -> int:
+        return len(self._created)
+
+    @contextmanager
+    def use(self) -> Iterator[Any]:
+        if self._closed:
+            raise RuntimeError("The subsystem has been shut down")
+        instance = self._get_shared() if self._thread_safe else self._checkout()
+        try:
+            yield instance
+        finally:
+            self._release(instance)
+
+    def close(self) -> None:
+        """
+        Shut down every instance that was created, calling its `close` method
+        if it has one. Subsystems that were never used cost nothing here either.
+        An instance in use is shut down when its caller is done with it. Every
+        instance is closed even if closing another one fails; the first error
+        is raised afterwards.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            idle = [instance for instance in self._created
+                    if instance is not None and not self._leases.get(id(instance))]
+            self._shared = None
+            while not self._idle.empty():
+                self._idle.get_nowait()
+            # Wakes up the callers waiting for an instance; each passes it on.
+            self._idle.put(_CLOSED)
+        _close_all(idle)
+
+    def _get_shared(self) -> Any:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The subsystem has been shut down")
+            if self._shared is None:
+                self._shared = self._factory()
+                self._created.append(self._shared)
+            instance = self._shared
+            self._lease(instance)
+        return instance
+
+    def _checkout(self) -> Any:
+        with self._lock:
+            try:
+                instance = self._idle.get_nowait()
+            except Empty:
+                instance = None
+            if instance is not None and instance is not _CLOSED:
+                self._lease(instance)
+                return instance
+            if instance is _CLOSED:
+                self._idle.put(_CLOSED)
+                raise RuntimeError("The subsystem has been shut down")
+            grow = len(self._created) < self._pool_size
+            if grow:
+                # Reserve the slot so concurrent callers don't overshoot.
+                self._created.append(None)
+        if not grow:
+            instance = self._idle.get(timeout=self._timeout)
+            with self._lock:
+                if instance is _CLOSED:
+                    self._idle.put(_CLOSED)
+                    raise RuntimeError("The subsystem has been shut down")
+                self._lease(instance)
+            return instance
+        try:
+            instance = self._factory()
+        except BaseException:
+            with self._lock:
+                self._created.remove(None)
+            raise
+        with self._lock:
+            self._created[self._created.index(None)] = instance
+            # Created during `close`, it is closed when released.
+            self._lease(instance)
+        return instance
+
+    def _lease(self, instance: Any) -> None:
+        self._leases[id(instance)] = self._leases.get(id(instance), 0) + 1
+
+    def _release(self, instance: Any) -> None:
+        with self._lock:
+            users = self._leases[id(instance)] - 1
+            if users:
+                self._leases[id(instance)] = users
+                return
+            del self._leases[id(instance)]
+            if not self._closed:
+                if not self._thread_safe:
+                    self._idle.put(instance)
+                return
+        _close_all([instance])
+
+
+_CLOSED = object()
+
+
+def _close_all(instances: List[Any]) -> None:
+    errors = []
+    for instance in instances:
+        close = getattr(instance, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception as error:
+                errors.append(error)
+    if errors:
+        raise errors[0]
+
+
+# create lazy facade class
+class LazyFacade(Facade):
+    """
+    A Facade that manages the lifecycle of its subsystems: it receives
+    factories instead of built subsystems, creates each subsystem on first use
+    and shuts all of them down in `close`. The cold start only pays for the
+    subsystems that requests actually use.
+    """
+
+    def __init__(self, subsystem1_factory: Callable[[], Subsystem1], subsystem2_factory: Callable[[], Subsystem2],
+                 subsystem1_thread_safe: bool = True, subsystem2_thread_safe: bool = True,
+                 pool_size: int = 4) -> None:
+        super().__init__(None, None)
+        self._subsystem1 = SubsystemProvider(subsystem1_factory, subsystem1_thread_safe, pool_size)
+        self._subsystem2 = SubsystemProvider(subsystem2_factory, subsystem2_thread_safe, pool_size)
+
+    def operation(self) -> str:
+        with ExitStack() as stack:
+            subsystem1_object = stack.enter_context(self._subsystem1.use())
+            subsystem2_object = stack.enter_context(self._subsystem2.use())
+            return Facade(subsystem1_object, subsystem2_object).operation()
+
+    def operation_subsystem1(self) -> str:
+        """
+        Requests served by this operation never create Subsystem2.
+        """
+        with self._subsystem1.use() as subsystem1_object:
+            return "\n".join(["Facade orders subsystem1 to perform the action:", subsystem1_object.operation_n()])
+
+    def created_subsystems(self) -> Dict[str, int]:
+        return {"subsystem1": self._subsystem1.created, "subsystem2": self._subsystem2.created}
+
+    def close(self) -> None:
+        try:
+            self._subsystem1.close()
+        finally:
+            self._subsystem2.close()
+
+    def __enter__(self) -> LazyFacade:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+# Subsystems that are slow to create; Subsystem2 is not thread-safe.
+class CostlySubsystem1(Subsystem1):
+    def __init__(self) -> None:
+        time.sleep(0.3)
+
+    def close(self) -> None:
+        print("Subsystem1: closed")
+
+
+class CostlySubsystem2(Subsystem2):
+    def __init__(self) -> None:
+        time.sleep(0.3)
+
+    def close(self) -> None:
+        print("Subsystem2: closed")
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    with LazyFacade(CostlySubsystem1, CostlySubsystem2, subsystem2_thread_safe=False, pool_size=2) as facade_obj:
+        print(f"Facade created in {time.perf_counter() - start:.3f} s\n")
+        print(facade_obj.operation_subsystem1())
+        print(f"Instances created: {facade_obj.created_subsystems()}\n")
+
+        clients = [Thread(target=facade_obj.operation) for _ in range(6)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        print(f"Instances created after 6 concurrent operations: {facade_obj.created_subsystems()}")
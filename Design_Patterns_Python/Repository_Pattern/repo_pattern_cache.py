@@ -0,0 +1,388 @@
+"""
+A caching decorator for any Repository.
+
+CachingRepository offers the Repository interface on top of another repository.
+
+Reads are read-through: a `get` is answered from an LRU cache bounded by a
+number of entries and, optionally, by the total size of the cached entities.
+An id that doesn't exist is cached as well (negative caching), so looking up
+missing ids again and again doesn't hit the storage either.
+
+Writes are write-behind: they update the cache and are queued. The queue is
+flushed to the wrapped repository as one batch, in one transaction, as soon as
+it holds `batch_size` writes or its oldest write is `flush_interval` seconds
+old. Several writes to the same id in between are coalesced into one. `close`,
+also called at interpreter exit, flushes what is left.
+
+Adding an id the cache knows to exist, or updating one it knows to be missing,
+raises KeyError right away. Other invalid writes are only found out by the
+wrapped repository: when a batch raises KeyError, its writes are retried one
+by one, and those rejected on their own are dropped from the queue and the
+cache, kept in `dead_letters` and passed to `on_error`. Any other error is
+taken as the storage being unavailable, and the batch is retried later. A
+failed batch can only be retried if the repository's `transaction` undid it;
+for a repository without transactions every write is sent on its own.
+
+The wrapped repository is used from the flusher thread; a SQLite connection
+must be opened with `check_same_thread=False`.
+"""
+
+from __future__ import annotations
+
+import atexit
+import copy
+import time
+from collections import OrderedDict
+from threading import Condition, Lock, Thread
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from repo_pattern_v1 import InMemoryRepository, Product, Repository, T
+
+_MISSING = object()
+
+
+# create caching repository class
+class CachingRepository(Repository[T]):
+    def __init__(self, repository: Repository[T], max_entries: int = 10_000, max_bytes: Optional[int] = None,
+                 sizeof: Optional[Callable[[T], int]] = None, negative_ttl: Optional[float] = 60.0,
+                 batch_size: int = 500, flush_interval: float = 1.0,
+                 on_error: Optional[Callable[[Any, Optional[T], Exception], None]] = None) -> None:
+        self.repository = repository
+        self.id_attribute = repository.id_attribute
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._negative_ttl = negative_ttl
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        # Called from the flushing thread with the id, the entity (None for a
+        # removal) and the error of every write the repository rejected.
+        self._on_error = on_error
+        self.dead_letters: List[Tuple[Any, Optional[T], Exception]] = []
+
+        self._lock = Lock()
+        self._flush_needed = Condition(self._lock)
+        # Reads on a miss and flushes both use the wrapped repository.
+        self._storage_lock = Lock()
+        self._transactional = type(repository).transaction is not Repository.transaction
+        # id -> (entity or _MISSING, size, negative entry expiry)
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        # id -> entity, or None for a removal. `_new` are the ids to insert,
+        # mapped to whether the stored entity must be removed first.
+        self._pending: Dict[Any, Optional[T]] = {}
+        self._new: Dict[Any, bool] = {}
+        self._oldest_pending: Optional[float] = None
+        self._closed = False
+        self._counters = {"hits": 0, "negative_hits": 0, "misses": 0, "evictions": 0,
+                          "writes": 0, "flushes": 0, "flushed_writes": 0, "flush_failures": 0,
+                          "rejected_writes": 0}
+
+        self._flusher = Thread(target=self._flush_loop, name="repository-flusher", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def get(self, entity_id: Any) -> Optional[T]:
+        with self._lock:
+            if entity_id in self._pending:
+                entity = self._pending[entity_id]
+                self._counters["hits" if entity is not None else "negative_hits"] += 1
+                return None if entity is None else copy.copy(entity)
+            entry = self._entries.get(entity_id)
+            if entry is not None:
+                entity, _, expires_at = entry
+                if entity is not _MISSING:
+                    self._entries.move_to_end(entity_id)
+                    self._counters["hits"] += 1
+                    return copy.copy(entity)
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(entity_id)
+                    self._counters["negative_hits"] += 1
+                    return None
+            self._counters["misses"] += 1
+
+        with self._storage_lock:
+            entity = self.repository.get(entity_id)
+        with self._lock:
+            # A write that arrived meanwhile is newer than what was read.
+            if entity_id not in self._pending:
+                self._cache(entity_id, _MISSING if entity is None else entity)
+        return None if entity is None else copy.copy(entity)
+
+    def list_all(self) -> List[T]:
+        self.flush()
+        with self._storage_lock:
+            return self.repository.list_all()
+
+    def page(self, after: Any = None, limit: int = 1000) -> List[T]:
+        """
+        Pages come from the wrapped repository, after flushing the queued writes.
+        """
+        self.flush()
+        with self._storage_lock:
+            return self.repository.page(after, limit)
+
+    def add_many(self, entities: Iterable[T]) -> None:
+        entities = list(entities)
+        with self._lock:
+            added = set()
+            for entity in entities:
+                entity_id = self.id_of(entity)
+                if entity_id in added or self._known(entity_id) is True:
+                    raise KeyError(f"Entity {entity_id} already exists")
+                added.add(entity_id)
+            for entity in entities:
+                entity_id = self.id_of(entity)
+                # Removed and added again before a flush: whether or not the
+                # storage has the id, removing and inserting it is right.
+                self._new[entity_id] = self._pending.get(entity_id, _MISSING) is None
+                self._write(entity_id, copy.copy(entity))
+
+    def update_many(self, entities: Iterable[T]) -> None:
+        entities = list(entities)
+        with self._lock:
+            for entity in entities:
+                if self._known(self.id_of(entity)) is False:
+                    raise KeyError(f"Entity {self.id_of(entity)} not found")
+            for entity in entities:
+                self._write(self.id_of(entity), copy.copy(entity))
+
+    def remove_many(self, entity_ids: Iterable[Any]) -> None:
+        with self._lock:
+            for entity_id in entity_ids:
+                if entity_id in self._new and not self._new[entity_id]:
+                    # Never reached the storage, nothing to remove there.
+                    del self._new[entity_id]
+                    del self._pending[entity_id]
+                    self._cache(entity_id, _MISSING)
+                else:
+                    self._new.pop(entity_id, None)
+                    self._write(entity_id, None)
+
+    def flush(self) -> None:
+        """
+        Write every queued write to the wrapped repository now.
+        """
+        with self._storage_lock:
+            with self._lock:
+                pending, new = self._take_pending()
+            if pending:
+                self._write_batch(pending, new)
+
+    def close(self) -> None:
+        """
+        Stop the flusher and flush what is left; raises if that fails.
+        """
+        atexit.unregister(self.close)
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._flush_needed.notify()
+        self._flusher.join()
+        self.flush()
+
+    def __enter__(self) -> CachingRepository[T]:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats: Dict[str, float] = dict(self._counters)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            stats["pending"] = len(self._pending)
+        reads = stats["hits"] + stats["negative_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["negative_hits"]) / reads if reads else 0.0
+        return stats
+
+    def _known(self, entity_id: Any) -> Optional[bool]:
+        """
+        Whether the id exists as far as the queue and the cache tell, None if
+        they don't know.
+        """
+        if entity_id in self._pending:
+            return self._pending[entity_id] is not None
+        entry = self._entries.get(entity_id)
+        if entry is None:
+            return None
+        entity, _, expires_at = entry
+        if entity is not _MISSING:
+            return True
+        if expires_at is None or expires_at > time.monotonic():
+            return False
+        return None
+
+    def _write(self, entity_id: Any, entity: Optional[T]) -> None:
+        if self._closed:
+            raise RuntimeError("The repository has been closed")
+        self._pending[entity_id] = entity
+        self._cache(entity_id, _MISSING if entity is None else entity)
+        self._counters["writes"] += 1
+        if self._oldest_pending is None:
+            self._oldest_pending = time.monotonic()
+            self._flush_needed.notify()
+        elif len(self._pending) >= self._batch_size:
+            self._flush_needed.notify()
+
+    def _cache(self, entity_id: Any, entity: Any) -> None:
+        old = self._entries.pop(entity_id, None)
+        if old is not None:
+            self._bytes -= old[1]
+        size = self._sizeof(entity) if self._sizeof is not None and entity is not _MISSING else 0
+        expires_at = None
+        if entity is _MISSING and self._negative_ttl is not None:
+            expires_at = time.monotonic() + self._negative_ttl
+        self._entries[entity_id] = (entity, size, expires_at)
+        self._bytes += size
+        while len(self._entries) > self._max_entries or \
+                (self._max_bytes is not None and self._bytes > self._max_bytes and len(self._entries) > 1):
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self._counters["evictions"] += 1
+
+    def _take_pending(self) -> Tuple[Dict[Any, Optional[T]], Dict[Any, bool]]:
+        pending, new = self._pending, self._new
+        self._pending, self._new = {}, {}
+        self._oldest_pending = None
+        return pending, new
+
+    def _write_batch(self, pending: Dict[Any, Optional[T]], new: Dict[Any, bool]) -> None:
+        """
+        Called with the storage lock held. If the storage rejects the batch,
+        the writes are retried one by one to find the rejected ones. On any
+        other failure the writes not done yet go back to the queue, unless
+        they have been overwritten in the meantime.
+        """
+        if not self._transactional:
+            # A failed batch may be partly applied, it can't be retried.
+            self._write_each(pending, new)
+            return
+        try:
+            self._apply(pending, new)
+        except KeyError:
+            self._write_each(pending, new)
+            return
+        except Exception:
+            self._requeue(pending, new)
+            raise
+        with self._lock:
+            self._counters["flushes"] += 1
+            self._counters["flushed_writes"] += len(pending)
+
+    def _apply(self, pending: Dict[Any, Optional[T]], new: Dict[Any, bool]) -> None:
+        with self.repository.transaction():
+            removed = [entity_id for entity_id, entity in pending.items()
+                       if entity is None or new.get(entity_id)]
+            if removed:
+                self.repository.remove_many(removed)
+            added = [entity for entity_id, entity in pending.items() if entity_id in new]
+            if added:
+                self.repository.add_many(added)
+            updated = [entity for entity_id, entity in pending.items()
+                       if entity is not None and entity_id not in new]
+            if updated:
+                self.repository.update_many(updated)
+
+    def _write_each(self, pending: Dict[Any, Optional[T]], new: Dict[Any, bool]) -> None:
+        writes = list(pending.items())
+        rejected = []
+        written = 0
+        try:
+            for position, (entity_id, entity) in enumerate(writes):
+                try:
+                    self._apply({entity_id: entity}, new)
+                    written += 1
+                except KeyError as error:
+                    rejected.append((entity_id, entity, error))
+                except Exception:
+                    self._requeue(dict(writes[position:]), new)
+                    raise
+        finally:
+            with self._lock:
+                self._counters["flushes"] += 1
+                self._counters["flushed_writes"] += written
+                self._counters["rejected_writes"] += len(rejected)
+                self.dead_letters.extend(rejected)
+                for entity_id, _, _ in rejected:
+                    # The cache must not keep serving what the storage refused.
+                    if entity_id not in self._pending:
+                        entry = self._entries.pop(entity_id, None)
+                        if entry is not None:
+                            self._bytes -= entry[1]
+            if self._on_error is not None:
+                for entity_id, entity, error in rejected:
+                    self._on_error(entity_id, entity, error)
+
+    def _requeue(self, pending: Dict[Any, Optional[T]], new: Dict[Any, bool]) -> None:
+        with self._lock:
+            self._counters["flush_failures"] += 1
+            for entity_id, entity in pending.items():
+                if entity_id not in self._pending:
+                    self._pending[entity_id] = entity
+                    if entity_id in new:
+                        self._new[entity_id] = new[entity_id]
+            if self._oldest_pending is None:
+                self._oldest_pending = time.monotonic()
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._lock:
+                while not self._closed:
+                    if len(self._pending) >= self._batch_size:
+                        break
+                    if self._oldest_pending is None:
+                        self._flush_needed.wait()
+                        continue
+                    wait = self._oldest_pending + self._flush_interval - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._flush_needed.wait(wait)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                # The storage is unavailable; the writes are queued again and
+                # retried after the interval.
+                time.sleep(self._flush_interval)
+
+
+# A repository standing for a slow remote database.
+class SlowRepository(InMemoryRepository[T]):
+    round_trips: int = 0
+
+    def get(self, entity_id: Any) -> Optional[T]:
+        SlowRepository.round_trips += 1
+        time.sleep(0.001)
+        return super().get(entity_id)
+
+    def add_many(self, entities: Iterable[T]) -> None:
+        SlowRepository.round_trips += 1
+        time.sleep(0.001)
+        super().add_many(entities)
+
+    def update_many(self, entities: Iterable[T]) -> None:
+        SlowRepository.round_trips += 1
+        time.sleep(0.001)
+        super().update_many(entities)
+
+
+if __name__ == "__main__":
+    import random
+
+    storage = SlowRepository()
+    with CachingRepository(storage, max_entries=500, batch_size=200, flush_interval=0.05) as repository:
+        for product_id in range(1000):
+            repository.add(Product(product_id, f"product {product_id}", 1.0))
+        for _ in range(5000):
+            product_id = int(random.paretovariate(1.2)) - 1
+            product = repository.get(product_id)
+            if product is not None and product_id % 10 == 0:
+                product.price += 1
+                repository.update(product)
+        print(repository.stats())
+
+    print(f"Storage round-trips: {SlowRepository.round_trips}, product 0 costs {storage.get(0).price}")
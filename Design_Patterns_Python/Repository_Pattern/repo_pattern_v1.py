@@ -1,4 +1,414 @@
 """
 Repository pattern is a data access pattern.
 It is used to abstract the data access layer from the business layer.
+
+The business code only depends on the Repository interface, the storage behind
+it is either a dict in memory or a SQLite table. Entities are dataclasses with
+an id attribute.
+
+A UnitOfWork sits between the business code and a repository for the duration
+of a business transaction. Its identity map makes sure an entity is loaded from
+storage only once, and every later `get` returns the very same object. Writes
+are only recorded; `commit` flushes them as one batch per kind of write
+(`executemany` for SQLite) inside a single transaction, instead of one
+statement and one commit per save.
+
+Reading a whole table is streamed rather than loaded: `iter_all` is a lazy
+iterator fetching one page at a time with keyset (seek) pagination, each page
+being the entities with the next ids after the last one seen. Unlike
+OFFSET paging, every page costs the same however deep into the table it is.
 """
+
+from __future__ import annotations
+
+import bisect
+import copy
+import os
+import sqlite3
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager, nullcontext
+from dataclasses import astuple, dataclass, fields
+from typing import Any, ContextManager, Dict, Generic, Iterable, Iterator, List, Optional, Type, TypeVar
+
+T = TypeVar("T")
+
+
+# create repository interface
+class Repository(ABC, Generic[T]):
+    id_attribute = "id"
+
+    def id_of(self, entity: T) -> Any:
+        return getattr(entity, self.id_attribute)
+
+    @abstractmethod
+    def get(self, entity_id: Any) -> Optional[T]:
+        """Return the entity with this id, or None"""
+        pass
+
+    @abstractmethod
+    def list_all(self) -> List[T]:
+        pass
+
+    @abstractmethod
+    def page(self, after: Any = None, limit: int = 1000) -> List[T]:
+        """
+        Up to `limit` entities with the smallest ids greater than `after`
+        (from the first id if None), in id order.
+        """
+        pass
+
+    def iter_all(self, page_size: int = 1000) -> Iterator[T]:
+        """
+        Every entity in id order, fetched lazily `page_size` at a time, so
+        memory stays constant and the first entity comes after one page.
+        """
+        after = None
+        while True:
+            entities = self.page(after, page_size)
+            yield from entities
+            if len(entities) < page_size:
+                return
+            after = self.id_of(entities[-1])
+
+    @abstractmethod
+    def add_many(self, entities: Iterable[T]) -> None:
+        pass
+
+    @abstractmethod
+    def update_many(self, entities: Iterable[T]) -> None:
+        pass
+
+    @abstractmethod
+    def remove_many(self, entity_ids: Iterable[Any]) -> None:
+        pass
+
+    def add(self, entity: T) -> None:
+        self.add_many([entity])
+
+    def update(self, entity: T) -> None:
+        self.update_many([entity])
+
+    def remove(self, entity_id: Any) -> None:
+        self.remove_many([entity_id])
+
+    def transaction(self) -> ContextManager:
+        """
+        Group several writes so they are applied all together or not at all.
+        By default there is no such guarantee, every write applies on its own.
+        """
+        return nullcontext()
+
+
+# create in-memory repository class
+class InMemoryRepository(Repository[T]):
+    """
+    Keeps copies of the entities, so like with a real storage, changes to an
+    entity are only stored by `update`.
+    """
+
+    def __init__(self) -> None:
+        self._entities: Dict[Any, T] = {}
+        # The ids in order, for paging; rebuilt after ids were added or removed.
+        self._sorted_ids: Optional[List[Any]] = None
+        # The entities as they were when the outermost transaction began.
+        self._snapshot: Optional[Dict[Any, T]] = None
+
+    def get(self, entity_id: Any) -> Optional[T]:
+        entity = self._entities.get(entity_id)
+        return None if entity is None else copy.copy(entity)
+
+    def list_all(self) -> List[T]:
+        return [copy.copy(entity) for entity in self._entities.values()]
+
+    def page(self, after: Any = None, limit: int = 1000) -> List[T]:
+        return [copy.copy(self._entities[entity_id]) for entity_id in self._id_page(after, limit)]
+
+    def _id_page(self, after: Any, limit: int) -> List[Any]:
+        if self._sorted_ids is None:
+            self._sorted_ids = sorted(self._entities)
+        start = 0 if after is None else bisect.bisect_right(self._sorted_ids, after)
+        return self._sorted_ids[start:start + limit]
+
+    def add_many(self, entities: Iterable[T]) -> None:
+        entities = list(entities)
+        seen = set()
+        for entity in entities:
+            # An id repeated within the batch is rejected too, like the primary key of a table does.
+            if self.id_of(entity) in self._entities or self.id_of(entity) in seen:
+                raise KeyError(f"Entity {self.id_of(entity)} already exists")
+            seen.add(self.id_of(entity))
+        for entity in entities:
+            self._entities[self.id_of(entity)] = copy.copy(entity)
+        self._sorted_ids = None
+
+    def update_many(self, entities: Iterable[T]) -> None:
+        entities = list(entities)
+        for entity in entities:
+            if self.id_of(entity) not in self._entities:
+                raise KeyError(f"Entity {self.id_of(entity)} not found")
+        for entity in entities:
+            self._entities[self.id_of(entity)] = copy.copy(entity)
+
+    def remove_many(self, entity_ids: Iterable[Any]) -> None:
+        for entity_id in entity_ids:
+            self._entities.pop(entity_id, None)
+        self._sorted_ids = None
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Puts the entities back as they were when the outermost transaction
+        began if an error is raised. Stored entities are replaced, never
+        changed in place, so a shallow copy of the dict is enough.
+        """
+        if self._snapshot is not None:
+            yield
+            return
+        self._snapshot = dict(self._entities)
+        try:
+            yield
+        except BaseException:
+            self._restore(self._snapshot)
+            raise
+        finally:
+            self._snapshot = None
+
+    def _restore(self, entities: Dict[Any, T]) -> None:
+        # The dict itself is kept, subclasses may hold on to it.
+        self._entities.clear()
+        self._entities.update(entities)
+        self._sorted_ids = None
+
+
+# create sqlite repository class
+class SqliteRepository(Repository[T]):
+    """
+    Stores the fields of a dataclass entity as the columns of `table`, the id
+    attribute being the primary key. Writes outside of `transaction` are
+    committed right away.
+    """
+
+    def __init__(self, connection: sqlite3.Connection, table: str, entity_type: Type[T],
+                 id_attribute: str = "id") -> None:
+        self.connection = connection
+        self.table = table
+        self.entity_type = entity_type
+        self.id_attribute = id_attribute
+        self._columns = [field.name for field in fields(entity_type)]
+        self._transaction_depth = 0
+
+        columns = ", ".join(f"{column} PRIMARY KEY" if column == id_attribute else column
+                            for column in self._columns)
+        self.connection.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+        self._select = f"SELECT {', '.join(self._columns)} FROM {table}"
+        self._insert = f"INSERT INTO {table} ({', '.join(self._columns)}) VALUES ({', '.join('?' * len(self._columns))})"
+        self._update = (f"UPDATE {table} SET {', '.join(f'{column} = ?' for column in self._columns)} "
+                        f"WHERE {id_attribute} = ?")
+        self._delete = f"DELETE FROM {table} WHERE {id_attribute} = ?"
+
+    def get(self, entity_id: Any) -> Optional[T]:
+        row = self.connection.execute(f"{self._select} WHERE {self.id_attribute} = ?", (entity_id,)).fetchone()
+        return None if row is None else self.entity_type(*row)
+
+    def list_all(self) -> List[T]:
+        return [self.entity_type(*row) for row in self.connection.execute(self._select)]
+
+    def page(self, after: Any = None, limit: int = 1000) -> List[T]:
+        if after is None:
+            cursor = self.connection.execute(f"{self._select} ORDER BY {self.id_attribute} LIMIT ?", (limit,))
+        else:
+            cursor = self.connection.execute(
+                f"{self._select} WHERE {self.id_attribute} > ? ORDER BY {self.id_attribute} LIMIT ?", (after, limit))
+        return [self.entity_type(*row) for row in cursor]
+
+    def iter_all(self, page_size: int = 1000, server_side: bool = False) -> Iterator[T]:
+        """
+        With `server_side`, a single query is stepped through by a cursor
+        instead, `page_size` rows per fetch. That avoids a query per page but
+        keeps the read open, and thus the table's snapshot, until the iterator
+        is exhausted or closed.
+        """
+        if not server_side:
+            yield from super().iter_all(page_size)
+            return
+        cursor = self.connection.execute(f"{self._select} ORDER BY {self.id_attribute}")
+        try:
+            while True:
+                rows = cursor.fetchmany(page_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield self.entity_type(*row)
+        finally:
+            cursor.close()
+
+    def add_many(self, entities: Iterable[T]) -> None:
+        try:
+            with self.transaction():
+                self.connection.executemany(self._insert, (astuple(entity) for entity in entities))
+        except sqlite3.IntegrityError as error:
+            raise KeyError(f"Entity already exists: {error}") from None
+
+    def update_many(self, entities: Iterable[T]) -> None:
+        entities = list(entities)
+        with self.transaction():
+            cursor = self.connection.executemany(
+                self._update, ((*astuple(entity), self.id_of(entity)) for entity in entities))
+            if cursor.rowcount != len(entities):
+                raise KeyError(f"{len(entities) - cursor.rowcount} of the entities not found")
+
+    def remove_many(self, entity_ids: Iterable[Any]) -> None:
+        with self.transaction():
+            self.connection.executemany(self._delete, ((entity_id,) for entity_id in entity_ids))
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Commits when the outermost transaction ends, rolls back on an error.
+        """
+        self._transaction_depth += 1
+        try:
+            yield
+        except BaseException:
+            if self._transaction_depth == 1:
+                self.connection.rollback()
+            raise
+        else:
+            if self._transaction_depth == 1:
+                self.connection.commit()
+        finally:
+            self._transaction_depth -= 1
+
+
+# create unit of work class
+class UnitOfWork(Generic[T]):
+    """
+    Tracks the entities loaded and changed during one business transaction.
+
+        with UnitOfWork(repository) as unit_of_work:
+            product = unit_of_work.get(1)
+            product.price = 10
+            unit_of_work.update(product)
+
+    Leaving the block commits, or rolls back if an exception was raised.
+    """
+
+    def __init__(self, repository: Repository[T]) -> None:
+        self.repository = repository
+        self._identity_map: Dict[Any, T] = {}
+        self._new: Dict[Any, T] = {}
+        self._dirty: Dict[Any, T] = {}
+        self._removed: Dict[Any, None] = {}
+
+    def get(self, entity_id: Any) -> Optional[T]:
+        if entity_id in self._removed:
+            return None
+        entity = self._identity_map.get(entity_id)
+        if entity is None:
+            entity = self.repository.get(entity_id)
+            if entity is not None:
+                self._identity_map[entity_id] = entity
+        return entity
+
+    def add(self, entity: T) -> None:
+        entity_id = self.repository.id_of(entity)
+        if entity_id in self._removed:
+            # Removed and added again in the same unit: it is a replacement.
+            del self._removed[entity_id]
+            self._dirty[entity_id] = entity
+        else:
+            self._new[entity_id] = entity
+        self._identity_map[entity_id] = entity
+
+    def update(self, entity: T) -> None:
+        entity_id = self.repository.id_of(entity)
+        if entity_id not in self._new:
+            self._dirty[entity_id] = entity
+        else:
+            self._new[entity_id] = entity
+        self._identity_map[entity_id] = entity
+
+    def remove(self, entity_id: Any) -> None:
+        self._identity_map.pop(entity_id, None)
+        self._dirty.pop(entity_id, None)
+        if self._new.pop(entity_id, None) is None:
+            self._removed[entity_id] = None
+
+    def commit(self) -> None:
+        with self.repository.transaction():
+            if self._removed:
+                self.repository.remove_many(list(self._removed))
+            if self._new:
+                self.repository.add_many(list(self._new.values()))
+            if self._dirty:
+                self.repository.update_many(list(self._dirty.values()))
+        self._new.clear()
+        self._dirty.clear()
+        self._removed.clear()
+
+    def rollback(self) -> None:
+        self._identity_map.clear()
+        self._new.clear()
+        self._dirty.clear()
+        self._removed.clear()
+
+    def __enter__(self) -> UnitOfWork[T]:
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+
+@dataclass
+class Product:
+    id: int
+    name: str
+    price: float
+
+
+def client_code(repository: Repository[Product], count: int) -> None:
+    start = time.perf_counter()
+    for product_id in range(count):
+        repository.add(Product(product_id, f"product {product_id}", 1.0))
+    print(f"  {count} single saves:         {time.perf_counter() - start:.3f} s")
+
+    start = time.perf_counter()
+    with UnitOfWork(repository) as unit_of_work:
+        for product_id in range(count, 2 * count):
+            unit_of_work.add(Product(product_id, f"product {product_id}", 1.0))
+        for product_id in range(count):
+            product = unit_of_work.get(product_id)
+            product.price *= 2
+            unit_of_work.update(product)
+        assert unit_of_work.get(0) is unit_of_work.get(0)
+    print(f"  {2 * count} writes in a unit of work: {time.perf_counter() - start:.3f} s")
+    print(f"  product 0 now costs {repository.get(0).price}")
+
+
+if __name__ == "__main__":
+    print("InMemoryRepository:")
+    client_code(InMemoryRepository(), 2000)
+
+    with tempfile.TemporaryDirectory() as directory:
+        connection = sqlite3.connect(os.path.join(directory, "products.db"))
+        print("SqliteRepository:")
+        sqlite_repository = SqliteRepository(connection, "products", Product)
+        client_code(sqlite_repository, 2000)
+
+        print("Streaming 100000 products:")
+        sqlite_repository.add_many(Product(product_id, f"product {product_id}", 1.0)
+                                   for product_id in range(4000, 100_000))
+        for server_side in (False, True):
+            start = time.perf_counter()
+            products = sqlite_repository.iter_all(page_size=500, server_side=server_side)
+            next(products)
+            first = time.perf_counter() - start
+            count = 1 + sum(1 for _ in products)
+            print(f"  {'server-side cursor' if server_side else 'keyset pages':<18}: first row after "
+                  f"{first * 1000:.2f} ms, {count} rows in {time.perf_counter() - start:.3f} s")
+        connection.close()
@@ -0,0 +1,375 @@
+"""
+Secondary indexes for the in-memory repository.
+
+Without an index, finding the entities with a given attribute value scans the
+whole collection. An IndexedInMemoryRepository can declare indexes on entity
+attributes, kept up to date on every add, update and remove:
+
+- HashIndex maps each value to the ids having it: equality in O(1).
+- SortedIndex keeps the values sorted next to their ids: equality, range and
+  prefix queries in O(log n) plus the size of the result.
+
+`find` takes conditions on any number of attributes. A small query planner asks
+every index able to answer one of the conditions how many entities it would
+return, reads the candidates from the most selective one and checks all the
+conditions on those candidates only. `explain` shows the plan that was picked.
+`iter_find` is the lazy variant; a scan without index pages through the ids
+like `iter_all` does.
+"""
+
+from __future__ import annotations
+
+import bisect
+import copy
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from repo_pattern_v1 import InMemoryRepository, Product, T
+
+
+# create query conditions
+class Condition(ABC):
+    @abstractmethod
+    def matches(self, value: Any) -> bool:
+        pass
+
+
+class Eq(Condition):
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def matches(self, value: Any) -> bool:
+        return value == self.value
+
+    def __repr__(self) -> str:
+        return f"Eq({self.value!r})"
+
+
+class Range(Condition):
+    """
+    low <= value < high; a bound that is None is open.
+    """
+
+    def __init__(self, low: Any = None, high: Any = None) -> None:
+        self.low = low
+        self.high = high
+
+    def matches(self, value: Any) -> bool:
+        return value is not None and (self.low is None or value >= self.low) and \
+            (self.high is None or value < self.high)
+
+    def __repr__(self) -> str:
+        return f"Range({self.low!r}, {self.high!r})"
+
+
+class Prefix(Range):
+    """
+    Strings starting with `prefix`, i.e. the range [prefix, next string after
+    all strings with that prefix).
+    """
+
+    def __init__(self, prefix: str) -> None:
+        high = prefix[:-1] + chr(ord(prefix[-1]) + 1) if prefix else None
+        super().__init__(prefix, high)
+        self.prefix = prefix
+
+    def matches(self, value: Any) -> bool:
+        return isinstance(value, str) and value.startswith(self.prefix)
+
+    def __repr__(self) -> str:
+        return f"Prefix({self.prefix!r})"
+
+
+# create index interface
+class Index(ABC):
+    def __init__(self, attribute: str) -> None:
+        self.attribute = attribute
+
+    @abstractmethod
+    def add(self, value: Any, entity_id: Any) -> None:
+        pass
+
+    @abstractmethod
+    def remove(self, value: Any, entity_id: Any) -> None:
+        """
+        An id that isn't indexed under `value` is ignored.
+        """
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+    def add_many(self, pairs: List[Tuple[Any, Any]]) -> None:
+        for value, entity_id in pairs:
+            self.add(value, entity_id)
+
+    @abstractmethod
+    def estimate(self, condition: Condition) -> Optional[int]:
+        """
+        How many ids `lookup` would return, or None if the index can't answer
+        the condition.
+        """
+        pass
+
+    @abstractmethod
+    def lookup(self, condition: Condition) -> Iterable[Any]:
+        pass
+
+
+class HashIndex(Index):
+    def __init__(self, attribute: str) -> None:
+        super().__init__(attribute)
+        self._ids: Dict[Any, Set[Any]] = {}
+
+    def add(self, value: Any, entity_id: Any) -> None:
+        self._ids.setdefault(value, set()).add(entity_id)
+
+    def remove(self, value: Any, entity_id: Any) -> None:
+        ids = self._ids.get(value)
+        if ids is None:
+            return
+        ids.discard(entity_id)
+        if not ids:
+            del self._ids[value]
+
+    def clear(self) -> None:
+        self._ids = {}
+
+    def estimate(self, condition: Condition) -> Optional[int]:
+        if type(condition) is not Eq:
+            return None
+        return len(self._ids.get(condition.value, ()))
+
+    def lookup(self, condition: Condition) -> Iterable[Any]:
+        return self._ids.get(condition.value, ())
+
+
+class SortedIndex(Index):
+    """
+    Two parallel lists, the sorted values and the id of each value, so ids
+    never have to be comparable. None values are not indexed.
+    """
+
+    def __init__(self, attribute: str) -> None:
+        super().__init__(attribute)
+        self._values: List[Any] = []
+        self._ids: List[Any] = []
+
+    def add(self, value: Any, entity_id: Any) -> None:
+        if value is None:
+            return
+        position = bisect.bisect_right(self._values, value)
+        self._values.insert(position, value)
+        self._ids.insert(position, entity_id)
+
+    def add_many(self, pairs: List[Tuple[Any, Any]]) -> None:
+        """
+        Inserting one by one moves the tail of the lists every time; a large
+        batch is appended and the lists are re-sorted instead, which sorting
+        does quickly since they consist of two sorted runs.
+        """
+        if len(pairs) < 64:
+            super().add_many(pairs)
+            return
+        pairs = sorted((pair for pair in pairs if pair[0] is not None), key=lambda pair: pair[0])
+        values = self._values + [value for value, _ in pairs]
+        ids = self._ids + [entity_id for _, entity_id in pairs]
+        order = sorted(range(len(values)), key=values.__getitem__)
+        self._values = [values[position] for position in order]
+        self._ids = [ids[position] for position in order]
+
+    def remove(self, value: Any, entity_id: Any) -> None:
+        if value is None:
+            return
+        try:
+            position = self._ids.index(entity_id, bisect.bisect_left(self._values, value),
+                                       bisect.bisect_right(self._values, value))
+        except ValueError:
+            return
+        del self._values[position]
+        del self._ids[position]
+
+    def clear(self) -> None:
+        self._values = []
+        self._ids = []
+
+    def estimate(self, condition: Condition) -> Optional[int]:
+        bounds = self._bounds(condition)
+        return None if bounds is None else bounds[1] - bounds[0]
+
+    def lookup(self, condition: Condition) -> Iterable[Any]:
+        start, end = self._bounds(condition)
+        return self._ids[start:end]
+
+    def _bounds(self, condition: Condition) -> Optional[Tuple[int, int]]:
+        if type(condition) is Eq:
+            if condition.value is None:
+                return None
+            return (bisect.bisect_left(self._values, condition.value),
+                    bisect.bisect_right(self._values, condition.value))
+        if isinstance(condition, Range):
+            start = 0 if condition.low is None else bisect.bisect_left(self._values, condition.low)
+            end = len(self._values) if condition.high is None else bisect.bisect_left(self._values, condition.high)
+            return start, max(start, end)
+        return None
+
+
+class PrimaryKeyIndex(Index):
+    """
+    The entity dict of the repository seen as an index on the id attribute;
+    it is maintained by the repository itself.
+    """
+
+    def __init__(self, attribute: str, entities: Dict[Any, Any]) -> None:
+        super().__init__(attribute)
+        self._entities = entities
+
+    def add(self, value: Any, entity_id: Any) -> None:
+        pass
+
+    def remove(self, value: Any, entity_id: Any) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def estimate(self, condition: Condition) -> Optional[int]:
+        if type(condition) is not Eq:
+            return None
+        return int(condition.value in self._entities)
+
+    def lookup(self, condition: Condition) -> Iterable[Any]:
+        return [condition.value] if condition.value in self._entities else []
+
+
+# create indexed in-memory repository class
+class IndexedInMemoryRepository(InMemoryRepository[T]):
+    def __init__(self, indexes: Iterable[Index] = ()) -> None:
+        super().__init__()
+        self._indexes: Dict[str, List[Index]] = {self.id_attribute: [PrimaryKeyIndex(self.id_attribute, self._entities)]}
+        for index in indexes:
+            self.add_index(index)
+
+    def add_index(self, index: Index) -> None:
+        """
+        Declare an index; entities already in the repository are indexed now.
+        """
+        index.add_many([(getattr(entity, index.attribute), entity_id)
+                        for entity_id, entity in self._entities.items()])
+        self._indexes.setdefault(index.attribute, []).append(index)
+
+    def add_many(self, entities: Iterable[T]) -> None:
+        entities = list(entities)
+        super().add_many(entities)
+        self._index_many([self.id_of(entity) for entity in entities])
+
+    def update_many(self, entities: Iterable[T]) -> None:
+        entities = list(entities)
+        previous = {self.id_of(entity): self._entities.get(self.id_of(entity)) for entity in entities}
+        super().update_many(entities)
+        for entity_id, old_entity in previous.items():
+            self._unindex(entity_id, old_entity)
+        self._index_many(list(previous))
+
+    def remove_many(self, entity_ids: Iterable[Any]) -> None:
+        entity_ids = list(dict.fromkeys(entity_ids))
+        for entity_id in entity_ids:
+            if entity_id in self._entities:
+                self._unindex(entity_id, self._entities[entity_id])
+        super().remove_many(entity_ids)
+
+    def find(self, **conditions: Any) -> List[T]:
+        """
+        Entities matching all conditions, e.g. `find(name=Prefix("a"),
+        price=Range(1, 5), category="tools")`; a plain value means Eq.
+        """
+        return list(self.iter_find(**conditions))
+
+    def iter_find(self, page_size: int = 1000, **conditions: Any) -> Iterator[T]:
+        conditions = _as_conditions(conditions)
+        index, attribute = self._plan(conditions)
+        if index is None:
+            candidate_ids = self._iter_ids(page_size)
+        else:
+            # A snapshot of the ids only, entities are copied as they are consumed.
+            candidate_ids = list(index.lookup(conditions[attribute]))
+        # The condition the index answered is checked again as well, so an
+        # index out of step with the entities can't return a wrong entity.
+        for entity_id in candidate_ids:
+            entity = self._entities.get(entity_id)
+            if entity is not None and all(condition.matches(getattr(entity, name))
+                                          for name, condition in conditions.items()):
+                yield copy.copy(entity)
+
+    def explain(self, **conditions: Any) -> str:
+        conditions = _as_conditions(conditions)
+        index, attribute = self._plan(conditions)
+        if index is None:
+            return f"full scan of {len(self._entities)} entities"
+        return (f"{type(index).__name__} on {attribute} {conditions[attribute]!r}, "
+                f"~{index.estimate(conditions[attribute])} candidates")
+
+    def _iter_ids(self, page_size: int) -> Iterator[Any]:
+        after = None
+        while True:
+            entity_ids = self._id_page(after, page_size)
+            yield from entity_ids
+            if len(entity_ids) < page_size:
+                return
+            after = entity_ids[-1]
+
+    def _plan(self, conditions: Dict[str, Condition]) -> Tuple[Optional[Index], Optional[str]]:
+        best, best_attribute, best_estimate = None, None, None
+        for attribute, condition in conditions.items():
+            for index in self._indexes.get(attribute, ()):
+                estimate = index.estimate(condition)
+                if estimate is not None and (best_estimate is None or estimate < best_estimate):
+                    best, best_attribute, best_estimate = index, attribute, estimate
+        return best, best_attribute
+
+    def _index_many(self, entity_ids: List[Any]) -> None:
+        entity_ids = list(dict.fromkeys(entity_ids))
+        for attribute, indexes in self._indexes.items():
+            pairs = [(getattr(self._entities[entity_id], attribute), entity_id) for entity_id in entity_ids]
+            for index in indexes:
+                index.add_many(pairs)
+
+    def _restore(self, entities: Dict[Any, T]) -> None:
+        # A rolled back transaction is rare, the indexes are simply rebuilt.
+        super()._restore(entities)
+        for indexes in self._indexes.values():
+            for index in indexes:
+                index.clear()
+        self._index_many(list(self._entities))
+
+    def _unindex(self, entity_id: Any, entity: T) -> None:
+        for attribute, indexes in self._indexes.items():
+            for index in indexes:
+                index.remove(getattr(entity, attribute), entity_id)
+
+
+def _as_conditions(conditions: Dict[str, Any]) -> Dict[str, Condition]:
+    return {attribute: condition if isinstance(condition, Condition) else Eq(condition)
+            for attribute, condition in conditions.items()}
+
+
+if __name__ == "__main__":
+    import time
+
+    repository = IndexedInMemoryRepository([HashIndex("name"), SortedIndex("name"), SortedIndex("price")])
+    repository.add_many(Product(product_id, f"product {product_id}", product_id % 1000 / 10)
+                        for product_id in range(200_000))
+    repository.update(Product(42, "special offer", 0.5))
+    repository.remove(7)
+
+    queries = [{"name": "product 123456"},
+               {"name": Prefix("special")},
+               {"price": Range(10, 10.2), "name": Prefix("product 99")},
+               {"id": 5},
+               {"price": 0.5, "name": Prefix("special")}]
+    for query in queries:
+        start = time.perf_counter()
+        found = repository.find(**query)
+        elapsed = time.perf_counter() - start
+        print(f"{query}: {len(found)} found in {elapsed * 1000:.2f} ms using {repository.explain(**query)}")
@@ -0,0 +1,335 @@
+"""
+Runtime instrumentation of the hot calls of the patterns.
+
+An Instrumentation wraps methods of existing classes, and the overrides of
+those methods in every subclass, at runtime; the pattern modules themselves
+are not changed. While enabled, each call of a wrapped method records:
+
+- the number of calls,
+- wall and CPU time, totals and power-of-two histograms in nanoseconds,
+- optionally, for a random share `sample_rate` of the calls, the Python call
+  stack leading to it, weighted by the call's self time (its time minus that
+  of the instrumented calls nested in it).
+
+`disable` puts the original functions back, so a disabled instrumentation costs
+nothing at all, not even a flag check. Reports are exported as JSON or as
+collapsed stacks, the input format of flame graph tools:
+
+    instrumentation = Instrumentation(sample_rate=0.01)
+    add_default_targets(instrumentation)
+    with instrumentation:
+        ...
+    print(instrumentation.to_collapsed())
+
+Every thread records its calls on its own, without locking; `report` adds the
+records of all threads up.
+
+Classes defined after `enable` are only wrapped by the next `enable`.
+"""
+
+from __future__ import annotations
+
+import functools
+import importlib
+import json
+import os
+import random
+import sys
+import time
+from threading import Lock, local
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# The hot calls of the patterns, as "directory/module:Class.method" relative to
+# this file. ConcreteComponentB implements accept without deriving from
+# ComponentInterface, so it is listed on its own.
+DEFAULT_TARGETS = [
+    "Behavioral_Pattern/Strategy_Pattern/strategy_pattern_v1:Context.execute_strategy",
+    "Behavioral_Pattern/Strategy_Pattern/strategy_pattern_v2:Strategy.do_algorithm",
+    "Visitor_Pattern/Visitor_Pattern1:ComponentInterface.accept",
+    "Visitor_Pattern/Visitor_Pattern1:ConcreteComponentB.accept",
+    "Observer_Pattern/subject_object_observer_pattern1:ConcreteSubjectInterface.notify",
+    "Facade_Pattern/facade_pattern1:Facade.operation",
+    "Composite_Pattern/composite_pattern_v1:Composite.operation",
+]
+
+_HISTOGRAM_BUCKETS = 64
+_MAX_STACK_DEPTH = 64
+
+
+class _CallStats:
+    __slots__ = ("calls", "wall_ns", "cpu_ns", "wall_histogram", "cpu_histogram")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.wall_ns = 0
+        self.cpu_ns = 0
+        # Bucket i counts the calls that took less than 2 ** i ns.
+        self.wall_histogram = [0] * _HISTOGRAM_BUCKETS
+        self.cpu_histogram = [0] * _HISTOGRAM_BUCKETS
+
+    def merge(self, other: _CallStats) -> None:
+        self.calls += other.calls
+        self.wall_ns += other.wall_ns
+        self.cpu_ns += other.cpu_ns
+        self.wall_histogram = [mine + theirs for mine, theirs in zip(self.wall_histogram, other.wall_histogram)]
+        self.cpu_histogram = [mine + theirs for mine, theirs in zip(self.cpu_histogram, other.cpu_histogram)]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "wall_ns": self.wall_ns, "cpu_ns": self.cpu_ns,
+                "wall_p50_ns": _percentile(self.wall_histogram, 0.5),
+                "wall_p99_ns": _percentile(self.wall_histogram, 0.99),
+                "wall_histogram": _histogram(self.wall_histogram),
+                "cpu_histogram": _histogram(self.cpu_histogram)}
+
+
+def _histogram(buckets: List[int]) -> Dict[str, int]:
+    return {f"<{2 ** index}": count for index, count in enumerate(buckets) if count}
+
+
+def _percentile(buckets: List[int], share: float) -> Optional[int]:
+    """
+    The upper bound of the bucket holding the given share of the calls.
+    """
+    total = sum(buckets)
+    seen = 0
+    for index, count in enumerate(buckets):
+        seen += count
+        if total and seen >= total * share:
+            return 2 ** index
+    return None
+
+
+class Instrumentation:
+    def __init__(self, sample_rate: float = 0.0) -> None:
+        self.sample_rate = sample_rate
+        self._targets: List[Tuple[type, str]] = []
+        self._installed: List[Tuple[type, str, Any]] = []
+        # The call stats and sampled stacks of every thread that made a call.
+        self._threads: List[Tuple[Dict[str, _CallStats], Dict[str, int]]] = []
+        self._lock = Lock()
+        self._local = local()
+        self._wrapper_codes = set()
+        # The code of every wrapped function, to name its frames by its key.
+        self._keys_by_code: Dict[Any, str] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._installed)
+
+    def add_target(self, cls: type, method_name: str) -> None:
+        """
+        Instrument `cls.method_name` and every override of it in subclasses.
+        Takes effect at the next `enable`.
+        """
+        self._targets.append((cls, method_name))
+
+    def add_target_spec(self, spec: str, base_dir: str = os.path.dirname(os.path.abspath(__file__))) -> None:
+        """
+        `spec` is "directory/module:Class.method". The directory is added to
+        sys.path, as running the module's siblings would, so that the class is
+        the very one the other modules of the directory import.
+        """
+        location, qualified_name = spec.split(":")
+        directory, module_name = os.path.split(location)
+        path = os.path.join(base_dir, directory)
+        if path not in sys.path:
+            sys.path.insert(0, path)
+        class_name, method_name = qualified_name.rsplit(".", 1)
+        self.add_target(getattr(importlib.import_module(module_name), class_name), method_name)
+
+    def enable(self) -> None:
+        if self._installed:
+            return
+        wrapped = set()
+        for cls, method_name in self._targets:
+            for owner in _with_subclasses(cls):
+                if method_name in vars(owner) and (owner, method_name) not in wrapped:
+                    wrapped.add((owner, method_name))
+                    original = vars(owner)[method_name]
+                    setattr(owner, method_name, self._wrap(original, f"{owner.__qualname__}.{method_name}"))
+                    self._installed.append((owner, method_name, original))
+
+    def disable(self) -> None:
+        for owner, method_name, original in reversed(self._installed):
+            setattr(owner, method_name, original)
+        self._installed = []
+
+    def __enter__(self) -> Instrumentation:
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.disable()
+
+    def reset(self) -> None:
+        with self._lock:
+            for stats, stacks in self._threads:
+                stats.clear()
+                stacks.clear()
+
+    def report(self) -> Dict[str, Any]:
+        merged, stacks = self._merged()
+        return {"sample_rate": self.sample_rate,
+                "calls": {key: stats.as_dict() for key, stats in sorted(merged.items()) if stats.calls},
+                "sampled_stacks_ns": dict(sorted(stacks.items()))}
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.report(), indent=indent)
+
+    def to_collapsed(self) -> str:
+        """
+        One `frame;frame;...;frame weight` line per sampled stack, the weight
+        being the self time in microseconds.
+        """
+        stacks = sorted(self._merged()[1].items())
+        return "\n".join(f"{stack} {max(1, weight // 1000)}" for stack, weight in stacks)
+
+    def _merged(self) -> Tuple[Dict[str, _CallStats], Dict[str, int]]:
+        """
+        The records of all threads added up. Threads still running may be
+        in the middle of recording a call, which then may be partly counted.
+        """
+        merged: Dict[str, _CallStats] = {}
+        merged_stacks: Dict[str, int] = {}
+        with self._lock:
+            threads = list(self._threads)
+        for stats, stacks in threads:
+            # Copying a dict is atomic, iterating one another thread adds to isn't.
+            for key, thread_stats in dict(stats).items():
+                merged.setdefault(key, _CallStats()).merge(thread_stats)
+            for stack, weight in dict(stacks).items():
+                merged_stacks[stack] = merged_stacks.get(stack, 0) + weight
+        return merged, merged_stacks
+
+    def _thread_records(self) -> List[List[Any]]:
+        """
+        Sets up the records of the current thread and returns its call stack.
+        """
+        state = self._local
+        state.calls, state.stats, state.stacks = [], {}, {}
+        with self._lock:
+            self._threads.append((state.stats, state.stacks))
+        return state.calls
+
+    def _wrap(self, original: Any, key: str) -> Any:
+        if isinstance(original, (staticmethod, classmethod)):
+            return type(original)(self._wrap(original.__func__, key))
+
+        function: Callable = original
+        thread_state = self._local
+        wall_clock, cpu_clock = time.perf_counter_ns, time.thread_time_ns
+
+        @functools.wraps(function)
+        def instrumented(*args: Any, **kwargs: Any) -> Any:
+            calls = getattr(thread_state, "calls", None)
+            if calls is None:
+                calls = self._thread_records()
+            sampled = self.sample_rate and random.random() < self.sample_rate
+            # [nested instrumented wall time, sampled stack or None]
+            frame = [0, self._stack(key) if sampled else None]
+            calls.append(frame)
+            wall_start, cpu_start = wall_clock(), cpu_clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                wall, cpu = wall_clock() - wall_start, cpu_clock() - cpu_start
+                calls.pop()
+                if calls:
+                    calls[-1][0] += wall
+                stats = thread_state.stats.get(key)
+                if stats is None:
+                    stats = thread_state.stats[key] = _CallStats()
+                stats.calls += 1
+                stats.wall_ns += wall
+                stats.cpu_ns += cpu
+                stats.wall_histogram[min(wall.bit_length(), _HISTOGRAM_BUCKETS - 1)] += 1
+                stats.cpu_histogram[min(cpu.bit_length(), _HISTOGRAM_BUCKETS - 1)] += 1
+                if frame[1] is not None:
+                    stacks = thread_state.stacks
+                    stacks[frame[1]] = stacks.get(frame[1], 0) + wall - frame[0]
+
+        self._wrapper_codes.add(instrumented.__code__)
+        if hasattr(function, "__code__"):
+            self._keys_by_code[function.__code__] = key
+        return instrumented
+
+    def _stack(self, key: str) -> str:
+        frames = []
+        frame = sys._getframe(2)
+        while frame is not None and len(frames) < _MAX_STACK_DEPTH:
+            code = frame.f_code
+            if code not in self._wrapper_codes:
+                frames.append(self._keys_by_code.get(code) or
+                              f"{frame.f_globals.get('__name__')}:{getattr(code, 'co_qualname', code.co_name)}")
+            frame = frame.f_back
+        frames.reverse()
+        frames.append(key)
+        return ";".join(frames)
+
+
+def _with_subclasses(cls: type) -> List[type]:
+    classes, pending = [], [cls]
+    while pending:
+        current = pending.pop()
+        if current not in classes:
+            classes.append(current)
+            pending.extend(current.__subclasses__())
+    return classes
+
+
+def add_default_targets(instrumentation: Instrumentation) -> None:
+    for spec in DEFAULT_TARGETS:
+        instrumentation.add_target_spec(spec)
+
+
+if __name__ == "__main__":
+    import contextlib
+    import io
+
+    instrumentation = Instrumentation(sample_rate=0.1)
+    add_default_targets(instrumentation)
+
+    from composite_pattern_v1 import Composite, Leaf
+    from facade_pattern1 import Facade, Subsystem1, Subsystem2
+    from strategy_add import ConcreteStrategyAdd
+    from strategy_pattern_v1 import Context
+    from strategy_pattern_v2 import ConcreteStrategyA
+
+    def workload() -> None:
+        tree = Composite()
+        for _ in range(10):
+            branch = Composite()
+            for _ in range(10):
+                branch.add(Leaf())
+            tree.add(branch)
+        context = Context()
+        context.set_strategy(ConcreteStrategyAdd())
+        facade = Facade(Subsystem1(), Subsystem2())
+        with contextlib.redirect_stdout(io.StringIO()):
+            for number in range(200):
+                tree.operation()
+                context.execute_strategy(number, 1)
+                ConcreteStrategyA().do_algorithm(["c", "a", "b"])
+                facade.operation()
+
+    original = Composite.operation
+    start = time.perf_counter()
+    workload()
+    baseline = time.perf_counter() - start
+
+    with instrumentation:
+        start = time.perf_counter()
+        workload()
+        instrumented = time.perf_counter() - start
+
+    start = time.perf_counter()
+    workload()
+    disabled = time.perf_counter() - start
+
+    print(f"Workload: {baseline * 1000:.1f} ms before, {instrumented * 1000:.1f} ms instrumented, "
+          f"{disabled * 1000:.1f} ms after disabling (original restored: {Composite.operation is original})\n")
+    for key, stats in instrumentation.report()["calls"].items():
+        print(f"{key:<32} {stats['calls']:>6} calls  p50 < {stats['wall_p50_ns']} ns  "
+              f"p99 < {stats['wall_p99_ns']} ns")
+    print("\nCollapsed stacks:")
+    print("\n".join(instrumentation.to_collapsed().splitlines()[:5]))
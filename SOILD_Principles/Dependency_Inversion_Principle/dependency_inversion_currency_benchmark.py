@@ -0,0 +1,175 @@
+"""
+Benchmark harness for the CurrencyConverterInterface implementations.
+
+For every synthetic rate table size and currency distribution, each converter is
+built and then measured on a scalar workload (`convert` per row) and a bulk
+workload (`convert_many` per batch). The results, throughput, latency
+percentiles and memory, are written as JSON so that runs can be compared over
+time to catch regressions.
+
+    python dependency_inversion_currency_benchmark.py --sizes 10 100 1000 10000 --output results.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from dependency_inversion_currency_converter import (AlphaRate, AplhaCurrency, CurrencyConverterInterface,
+                                                     FXConverter, FXRate, np)
+from dependency_inversion_currency_history import HistoricalFXConverter, RateHistory, write_history
+from dependency_inversion_currency_snapshot import VersionedFXConverter
+
+Workload = Tuple[List[Decimal], List[str], List[str]]
+
+
+def synthetic_rates(size: int, seed: int) -> List[Tuple[str, Decimal]]:
+    generator = random.Random(seed)
+    return [(f"C{index:05d}", Decimal(generator.randint(1, 10 ** 8)).scaleb(-4)) for index in range(size)]
+
+
+def synthetic_workload(codes: Sequence[str], rows: int, distribution: str, seed: int) -> Workload:
+    """
+    `uniform` picks every currency with the same probability, `skewed` follows
+    a Zipf-like distribution where a few currencies dominate, as in real traffic.
+    """
+    generator = random.Random(seed)
+    weights = None
+    if distribution == "skewed":
+        weights = [1 / (rank + 1) ** 1.2 for rank in range(len(codes))]
+    amounts = [Decimal(generator.randint(1, 10 ** 9)).scaleb(-2) for _ in range(rows)]
+    return amounts, generator.choices(codes, weights, k=rows), generator.choices(codes, weights, k=rows)
+
+
+def converter_factories(directory: str) -> Dict[str, Callable[[List[Tuple[str, Decimal]]], CurrencyConverterInterface]]:
+    """
+    Every implementation under test, built from the same (code, rate) pairs.
+    """
+
+    def historical(rates: List[Tuple[str, Decimal]]) -> CurrencyConverterInterface:
+        path = os.path.join(directory, f"rates-{len(rates)}.fxh")
+        write_history(path, {code: [(0, rate)] for code, rate in rates})
+        return HistoricalFXConverter(RateHistory(path))
+
+    return {
+        "FXConverter": lambda rates: FXConverter([FXRate(code, rate) for code, rate in rates]),
+        "AplhaCurrency": lambda rates: AplhaCurrency([AlphaRate(code, rate) for code, rate in rates]),
+        "VersionedFXConverter": lambda rates: VersionedFXConverter([FXRate(code, rate) for code, rate in rates]),
+        "HistoricalFXConverter": historical,
+    }
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {f"p{percentile}": ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+            for percentile in (50, 90, 99)}
+
+
+def measure_build(factory: Callable, rates: List[Tuple[str, Decimal]]) -> Tuple[Any, Dict[str, float]]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    converter = factory(rates)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return converter, {"build_seconds": elapsed, "retained_bytes": current, "peak_bytes": peak}
+
+
+def measure_scalar(converter: CurrencyConverterInterface, workload: Workload) -> Dict[str, Any]:
+    convert = converter.convert
+    clock = time.perf_counter_ns
+    latencies = []
+    start = time.perf_counter()
+    for amount, from_currency, to_currency in zip(*workload):
+        call_start = clock()
+        convert(amount, from_currency, to_currency)
+        latencies.append(clock() - call_start)
+    elapsed = time.perf_counter() - start
+    return {"rows": len(latencies), "seconds": elapsed, "rows_per_second": len(latencies) / elapsed,
+            "latency_ns": percentiles(latencies)}
+
+
+def measure_bulk(converter: CurrencyConverterInterface, amounts: Any, from_currencies: Sequence[str],
+                 to_currencies: Sequence[str], batch_size: int) -> Dict[str, Any]:
+    batches = [(amounts[offset:offset + batch_size], from_currencies[offset:offset + batch_size],
+                to_currencies[offset:offset + batch_size]) for offset in range(0, len(amounts), batch_size)]
+    latencies = []
+    start = time.perf_counter()
+    for batch in batches:
+        batch_start = time.perf_counter_ns()
+        converter.convert_many(*batch)
+        latencies.append(time.perf_counter_ns() - batch_start)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    converter.convert_many(*batches[0])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"rows": len(amounts), "batch_size": batch_size, "seconds": elapsed,
+            "rows_per_second": len(amounts) / elapsed, "batch_latency_ns": percentiles(latencies),
+            "batch_peak_bytes": peak}
+
+
+def run(sizes: Sequence[int], rows: int, batch_size: int, seed: int) -> Dict[str, Any]:
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        factories = converter_factories(directory)
+        for size in sizes:
+            rates = synthetic_rates(size, seed)
+            codes = [code for code, _ in rates]
+            for name, factory in factories.items():
+                converter, build = measure_build(factory, rates)
+                for distribution in ("uniform", "skewed"):
+                    workload = synthetic_workload(codes, rows, distribution, seed)
+                    result = {"converter": name, "currencies": size, "distribution": distribution, "build": build,
+                              "scalar": measure_scalar(converter, workload),
+                              "bulk": measure_bulk(converter, *workload, batch_size)}
+                    if np is not None and converter.supports_fixed_point:
+                        cents = np.array([int(amount.scaleb(2)) for amount in workload[0]], dtype=np.int64)
+                        result["bulk_fixed_point"] = measure_bulk(converter, cents, np.array(workload[1]),
+                                                                  np.array(workload[2]), batch_size)
+                    results.append(result)
+                    print(f"{name:<22} {size:>6} currencies {distribution:<8} "
+                          f"scalar {result['scalar']['rows_per_second']:>12,.0f}/s  "
+                          f"bulk {result['bulk']['rows_per_second']:>12,.0f}/s", file=sys.stderr)
+                if hasattr(converter, "rate_history"):
+                    converter.rate_history.close()
+                del converter
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": None if np is None else np.__version__,
+        "parameters": {"sizes": list(sizes), "rows": rows, "batch_size": batch_size, "seed": seed},
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="currency_benchmark.json")
+    arguments = parser.parse_args()
+
+    report = run(arguments.sizes, arguments.rows, arguments.batch_size, arguments.seed)
+    with open(arguments.output, "w", encoding="utf-8") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Results written to {arguments.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,313 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from decimal import Decimal
-from typing import List
+from decimal import ROUND_HALF_EVEN, Decimal
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed to convert fixed-point arrays.
+    np = None
+
+# Fixed-point cross rates are integers of FIXED_RATE_LIMBS limbs of 9 digits,
+# so that every partial product fits into an int64, times 1e-9 to the power of
+# a per-rate shift. The shift is picked to keep at least 28 significant digits,
+# the precision of a Decimal cross rate, which is thus represented exactly.
+FIXED_RATE_LIMBS = 4
+_LIMB = 10 ** 9
+_MAX_SHIFT = 5
 
 
 class CurrencyConverterInterface(ABC):
+    # Whether `convert_many` also takes an int64 NumPy array of fixed-point
+    # amounts, e.g. cents, and returns an int64 array with the same scale.
+    supports_fixed_point = False
+
     @abstractmethod
     def convert(self, amount: Decimal, from_currency: str, to_currency: str) -> Decimal:
         pass
 
+    def convert_many(self, amounts: Sequence[Decimal], from_currencies: Sequence[str],
+                     to_currencies: Sequence[str]) -> List[Decimal]:
+        """
+        Convert whole columns of amounts in one call. Converters can override
+        this with a faster bulk implementation.
+        """
+        return [self.convert(amount, from_currency, to_currency)
+                for amount, from_currency, to_currency in zip(amounts, from_currencies, to_currencies)]
 
-class FXConverter(CurrencyConverterInterface):
-    def __init__(self, fx_rates: List[FXRate]) -> None:
-        self.fx_rates = fx_rates
+
+class RateTable:
+    """
+    Rate backend shared by the converters. Every currency code is mapped to a
+    dense integer ID, and the cross rate `to_rate / from_rate` of every pair is
+    computed once, so a conversion is two dict lookups, one list index and one
+    multiplication. The cross rates are the same Decimal quotients the scan
+    based converters computed on every call, so results are unchanged.
+
+    The full matrix has one entry per pair of currencies; above `matrix_limit`
+    currencies it would be too large, and the cross rate is divided on demand.
+    `updated` derives the table of new rates from this one, recomputing only
+    the rows and columns of the currencies that changed. A currency whose rate
+    is zero, e.g. a placeholder, gets no cross rates: like with the scan, only
+    converting from it fails, with the error of dividing by its rate.
+    """
+
+    def __init__(self, rates: Iterable[Any], matrix_limit: int = 256) -> None:
+        self.matrix_limit = matrix_limit
+        self.codes: List[str] = []
+        self.rates: List[Decimal] = []
+        self._ids: Dict[str, int] = {}
+        for rate in rates:
+            # Like the linear scan, the first rate listed for a currency wins.
+            if rate.currency not in self._ids:
+                self._ids[rate.currency] = len(self.codes)
+                self.codes.append(rate.currency)
+                self.rates.append(rate.rate)
+
+        self._matrix: Optional[List[List[Optional[Decimal]]]] = None
+        self._fixed_matrix: Optional[np.ndarray] = None
+        if len(self.codes) <= matrix_limit:
+            self._matrix = [_cross_rates(from_rate, self.rates) for from_rate in self.rates]
+
+    def updated(self, rates: Mapping[str, Decimal]) -> RateTable:
+        """
+        A new table where the currencies in `rates` have the given rate; those
+        that are not known yet are added. This table is not changed. The rows
+        of the matrix share the unchanged cross rates with this table, so
+        every table costs one pointer per pair rather than one Decimal.
+        """
+        table = RateTable((), self.matrix_limit)
+        table.codes = list(self.codes)
+        table.rates = list(self.rates)
+        table._ids = dict(self._ids)
+        for currency, rate in rates.items():
+            if currency in table._ids:
+                table.rates[table._ids[currency]] = rate
+            else:
+                table._ids[currency] = len(table.codes)
+                table.codes.append(currency)
+                table.rates.append(rate)
+
+        size = len(table.codes)
+        if size > self.matrix_limit:
+            return table
+        if self._matrix is None:
+            table._matrix = [_cross_rates(from_rate, table.rates) for from_rate in table.rates]
+            return table
+
+        changed = sorted({table._ids[currency] for currency in rates})
+        changed_set = set(changed)
+        old_size = len(self.codes)
+        matrix = []
+        for from_id, from_rate in enumerate(table.rates):
+            if from_id in changed_set:
+                matrix.append(_cross_rates(from_rate, table.rates))
+                continue
+            row = self._matrix[from_id][:]
+            row.extend([None] * (size - old_size))
+            if from_rate:
+                for to_id in changed:
+                    row[to_id] = table.rates[to_id] / from_rate
+            matrix.append(row)
+        table._matrix = matrix
+
+        if self._fixed_matrix is not None:
+            fixed = np.empty((self._fixed_matrix.shape[0], size, size), dtype=np.int64)
+            fixed[:, :old_size, :old_size] = self._fixed_matrix
+            fixed[:, changed, :] = _fixed_limbs(matrix[from_id][to_id] for from_id in changed
+                                                for to_id in range(size)).reshape(-1, len(changed), size)
+            fixed[:, :, changed] = _fixed_limbs(matrix[from_id][to_id] for from_id in range(size)
+                                                for to_id in changed).reshape(-1, size, len(changed))
+            table._fixed_matrix = fixed
+        return table
+
+    def currency_id(self, currency: str) -> int:
+        try:
+            return self._ids[currency]
+        except KeyError:
+            raise Exception(f"Rate for {currency} not found") from None
+
+    def rate(self, currency: str) -> Decimal:
+        return self.rates[self.currency_id(currency)]
+
+    def cross_rate(self, from_currency: str, to_currency: str) -> Decimal:
+        from_id = self.currency_id(from_currency)
+        to_id = self.currency_id(to_currency)
+        if self._matrix is not None and self._matrix[from_id][to_id] is not None:
+            return self._matrix[from_id][to_id]
+        return self.rates[to_id] / self.rates[from_id]
 
     def convert(self, amount: Decimal, from_currency: str, to_currency: str) -> Decimal:
         if from_currency == to_currency:
             return amount
+        return amount * self.cross_rate(from_currency, to_currency)
 
-        from_rate = self._get_rate(from_currency)
-        to_rate = self._get_rate(to_currency)
+    def convert_many(self, amounts, from_currencies: Sequence[str], to_currencies: Sequence[str]):
+        """
+        Decimal amounts give a list of Decimals, identical to `convert`. An
+        int64 NumPy array of fixed-point amounts is converted vectorized and
+        gives an int64 array with the same scale.
+        """
+        if np is not None and isinstance(amounts, np.ndarray) and amounts.dtype.kind == "i":
+            return self.convert_many_fixed(amounts, from_currencies, to_currencies)
+        convert = self.convert
+        return [convert(amount, from_currency, to_currency)
+                for amount, from_currency, to_currency in zip(amounts, from_currencies, to_currencies)]
 
-        return amount * (to_rate / from_rate)
+    def currency_ids(self, currencies: Sequence[str]) -> np.ndarray:
+        """
+        Map a column of currency codes to an int64 array of currency IDs.
+        """
+        try:
+            return np.fromiter(map(self._ids.__getitem__, currencies), dtype=np.int64, count=len(currencies))
+        except KeyError as error:
+            raise Exception(f"Rate for {error.args[0]} not found") from None
 
-    def _get_rate(self, currency: str) -> Decimal:
-        for rate in self.fx_rates:
-            if rate.currency == currency:
-                return rate.rate
+    def convert_many_fixed(self, amounts: np.ndarray, from_currencies: Sequence[str],
+                           to_currencies: Sequence[str]) -> np.ndarray:
+        """
+        Vectorized conversion of int64 fixed-point amounts, e.g. amounts in
+        cents; the result has the same scale. The product of every amount with
+        its exact Decimal cross rate is computed exactly with 9-digit limbs and
+        rounded half-even once, like `convert(...).quantize(..., ROUND_HALF_EVEN)`.
+        The two only differ when the exact result lies within 5e-10 units of
+        a tie (x.5), where the 28 digit Decimal product already rounded it to
+        the tie. Amounts must stay below 1e18 units and cross rates at least
+        1e-18.
+        """
+        if np is None:
+            raise ImportError("convert_many_fixed requires NumPy")
+        amounts = np.asarray(amounts, dtype=np.int64)
+        *q, shift = self._fixed_cross_rates(self._as_ids(from_currencies), self._as_ids(to_currencies))
+
+        magnitude = np.abs(amounts)
+        if magnitude.size and magnitude.max() >= _LIMB ** 2:
+            raise OverflowError("Fixed-point amounts must be below 1e18")
+        a1, a0 = np.divmod(magnitude, _LIMB)
+
+        # Schoolbook multiplication in base 1e9, propagating carries; every
+        # partial sum stays below 2e18 + 2e9.
+        zero = np.zeros_like(magnitude)
+        limbs = [zero]
+        carry = zero
+        for position in range(FIXED_RATE_LIMBS + 1):
+            partial = carry
+            if position < FIXED_RATE_LIMBS:
+                partial = partial + a0 * q[position]
+            if position > 0:
+                partial = partial + a1 * q[position - 1]
+            carry = partial // _LIMB
+            limbs.append(partial % _LIMB)
+        limbs += [carry, zero, zero]
+        # limbs[k + 1] is the k-th limb of the product; the padding lets every
+        # shift gather the same positions.
+        limbs = np.stack(limbs)
+        nonzero = np.cumsum(limbs != 0, axis=0)
+
+        def at(offset: int) -> np.ndarray:
+            return np.take_along_axis(limbs, (shift + offset)[np.newaxis], axis=0)[0]
+
+        # Dividing by 1e9 ** shift drops the `shift` lowest limbs, which decide the rounding.
+        high = at(3)
+        above = nonzero[-1] - np.take_along_axis(nonzero, (shift + 3)[np.newaxis], axis=0)[0]
+        if high.size and ((high >= np.iinfo(np.int64).max // _LIMB ** 2) | (above > 0)).any():
+            raise OverflowError("Converted amounts do not fit into int64")
+        result = (high * _LIMB + at(2)) * _LIMB + at(1)
+        fraction_high = at(0)
+        fraction_low = np.take_along_axis(nonzero, np.maximum(shift - 1, 0)[np.newaxis], axis=0)[0]
+        half = _LIMB // 2
+        round_up = (fraction_high > half) | ((fraction_high == half) & ((fraction_low > 0) | (result % 2 == 1)))
+        result = result + round_up
+        return np.where(amounts < 0, -result, result)
+
+    def _as_ids(self, currencies: Sequence[str]) -> np.ndarray:
+        # Callers converting many batches can map the codes to IDs once.
+        if isinstance(currencies, np.ndarray) and currencies.dtype.kind in "iu":
+            return currencies.astype(np.int64, copy=False)
+        return self.currency_ids(currencies)
+
+    def _fixed_cross_rates(self, from_ids: np.ndarray, to_ids: np.ndarray):
+        """
+        The fixed-point limbs and shift of the cross rate of every (from, to)
+        pair. With a precomputed matrix they are derived once for the whole
+        matrix, otherwise once per distinct pair in the batch.
+        """
+        if self._matrix is not None:
+            if self._fixed_matrix is None:
+                size = len(self.codes)
+                self._fixed_matrix = _fixed_limbs(cross_rate for row in self._matrix for cross_rate in row)
+                self._fixed_matrix = self._fixed_matrix.reshape(FIXED_RATE_LIMBS + 1, size, size)
+            fixed = tuple(limb[from_ids, to_ids] for limb in self._fixed_matrix)
+            missing = np.flatnonzero(fixed[-1] < 0)
+            if missing.size:
+                # Raises the error of dividing by the zero rate.
+                self.rates[to_ids[missing[0]]] / self.rates[from_ids[missing[0]]]
+            return fixed
+
+        size = len(self.codes)
+        pairs, inverse = np.unique(from_ids * size + to_ids, return_inverse=True)
+        limbs = _fixed_limbs(self.rates[to_id] / self.rates[from_id]
+                             for from_id, to_id in (divmod(pair, size) for pair in pairs.tolist()))
+        return tuple(limb[inverse.reshape(-1)] for limb in limbs)
 
-        raise Exception(f"Rate for {currency} not found")
+
+def _cross_rates(from_rate: Decimal, rates: Sequence[Decimal]) -> List[Optional[Decimal]]:
+    """
+    One row of the matrix; None where the division has to fail on use.
+    """
+    if not from_rate:
+        return [None] * len(rates)
+    return [to_rate / from_rate for to_rate in rates]
+
+
+def _fixed_limbs(cross_rates: Iterable[Optional[Decimal]]) -> np.ndarray:
+    """
+    Write every cross rate as an integer of FIXED_RATE_LIMBS 9-digit limbs
+    q0, q1, ... and a shift: rate = (... + q1 * 1e9 + q0) * 1e-9 ** shift. The
+    shift makes the integer at least 1e27, so a rate of up to 28 significant
+    digits is exact. A missing cross rate gets the shift -1.
+    """
+    fixed_rates = []
+    for cross_rate in cross_rates:
+        if cross_rate is None:
+            fixed_rates.append([0] * FIXED_RATE_LIMBS + [-1])
+            continue
+        shift = 0 if not cross_rate else -((cross_rate.adjusted() - 27) // 9)
+        scaled = int(cross_rate.scaleb(9 * shift).to_integral_value(ROUND_HALF_EVEN))
+        if not 0 <= shift <= _MAX_SHIFT or not 0 <= scaled < _LIMB ** FIXED_RATE_LIMBS:
+            raise OverflowError(f"Cross rate {cross_rate} is out of the fixed-point range")
+        fixed_rates.append([scaled // _LIMB ** limb % _LIMB for limb in range(FIXED_RATE_LIMBS)] + [shift])
+    return np.array(fixed_rates, dtype=np.int64).reshape(-1, FIXED_RATE_LIMBS + 1).T.copy()
+
+
+class FXConverter(CurrencyConverterInterface):
+    supports_fixed_point = True
+
+    def __init__(self, fx_rates: Iterable[FXRate]) -> None:
+        self.fx_rates = fx_rates
+
+    @property
+    def fx_rates(self) -> Tuple[FXRate, ...]:
+        """
+        A tuple, since the rate table is built from the rates when they are
+        assigned; to change them, assign new ones.
+        """
+        return self._fx_rates
+
+    @fx_rates.setter
+    def fx_rates(self, fx_rates: Iterable[FXRate]) -> None:
+        self._fx_rates = tuple(fx_rates)
+        self._rate_table = RateTable(self._fx_rates)
+
+    def convert(self, amount: Decimal, from_currency: str, to_currency: str) -> Decimal:
+        return self._rate_table.convert(amount, from_currency, to_currency)
+
+    def convert_many(self, amounts, from_currencies: Sequence[str], to_currencies: Sequence[str]):
+        return self._rate_table.convert_many(amounts, from_currencies, to_currencies)
+
+    def _get_rate(self, currency: str) -> Decimal:
+        return self._rate_table.rate(currency)
 
 
 class AlphaRate:
@@ -45,24 +323,31 @@ class FXRate:
 
 
 class AplhaCurrency(CurrencyConverterInterface):
-    def __init__(self, alpha_rates: List[AlphaRate]) -> None:
+    supports_fixed_point = True
+
+    def __init__(self, alpha_rates: Iterable[AlphaRate]) -> None:
         self.alpha_rates = alpha_rates
 
-    def convert(self, amount: Decimal, from_currency: str, to_currency: str) -> Decimal:
-        if from_currency == to_currency:
-            return amount
+    @property
+    def alpha_rates(self) -> Tuple[AlphaRate, ...]:
+        """
+        A tuple, like `FXConverter.fx_rates`; to change the rates, assign new ones.
+        """
+        return self._alpha_rates
 
-        from_rate = self._get_rate(from_currency)
-        to_rate = self._get_rate(to_currency)
+    @alpha_rates.setter
+    def alpha_rates(self, alpha_rates: Iterable[AlphaRate]) -> None:
+        self._alpha_rates = tuple(alpha_rates)
+        self._rate_table = RateTable(self._alpha_rates)
 
-        return amount * (to_rate / from_rate)
+    def convert(self, amount: Decimal, from_currency: str, to_currency: str) -> Decimal:
+        return self._rate_table.convert(amount, from_currency, to_currency)
 
-    def _get_rate(self, currency: str) -> Decimal:
-        for rate in self.alpha_rates:
-            if rate.currency == currency:
-                return rate.rate
+    def convert_many(self, amounts, from_currencies: Sequence[str], to_currencies: Sequence[str]):
+        return self._rate_table.convert_many(amounts, from_currencies, to_currencies)
 
-        raise Exception(f"Rate for {currency} not found")
+    def _get_rate(self, currency: str) -> Decimal:
+        return self._rate_table.rate(currency)
 
 
 class App:
@@ -92,3 +377,9 @@ if __name__ == "__main__":
     app.start()
     app = App(alpha_converter)
     app.start()
+
+    amounts = [Decimal(100), Decimal(250)]
+    print(f"Bulk USD->EUR, GBP->USD: {fx_converter.convert_many(amounts, ['USD', 'GBP'], ['EUR', 'USD'])}")
+    if np is not None:
+        cents = np.array([10000, 25000], dtype=np.int64)
+        print(f"Bulk in cents with NumPy: {fx_converter.convert_many(cents, ['USD', 'GBP'], ['EUR', 'USD'])}")
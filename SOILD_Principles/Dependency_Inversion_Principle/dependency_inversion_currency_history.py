@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+"""
+Historical, time-indexed rates for conversions at past timestamps.
+
+FXRate/AlphaRate only know the current rate of a currency. The rate history is
+kept in a columnar binary file instead:
+
+    header      magic, currency count, rate scale, record count
+    codes       one 8 byte ASCII code per currency
+    offsets     int64 start of every currency's records, plus the end
+    timestamps  int64 column, sorted within every currency
+    rates       int64 column, fixed-point rates scaled by 10 ** rate scale
+
+Every section is 8 byte aligned, so the columns are used directly as int64
+views of the memory-mapped file. Opening even a huge history only maps the file,
+nothing is parsed, and a lookup is a binary search inside one currency's records.
+"""
+
+import bisect
+import mmap
+import os
+import struct
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+from dependency_inversion_currency_converter import CurrencyConverterInterface
+
+MAGIC = b"FXHIST01"
+HEADER = struct.Struct("<8sIIQQ")
+CODE = struct.Struct("<8s")
+
+Timestamp = Union[int, datetime]
+
+
+def write_history(path: str, history: Dict[str, Iterable[Tuple[int, Decimal]]], rate_scale: int = 10) -> None:
+    """
+    Write `history`, {currency: [(timestamp, rate), ...]}, as a rate history
+    file. Timestamps are integers (e.g. epoch seconds) and rates must have at
+    most `rate_scale` decimal places.
+    """
+    codes = sorted(history)
+    columns = [sorted(history[code]) for code in codes]
+    record_count = sum(len(column) for column in columns)
+
+    with open(path, "wb") as history_file:
+        history_file.write(HEADER.pack(MAGIC, len(codes), rate_scale, record_count, 0))
+        for code in codes:
+            history_file.write(CODE.pack(code.encode("ascii")))
+        offset = 0
+        for column in [[]] + columns:
+            offset += len(column)
+            history_file.write(struct.pack("<q", offset))
+        for column in columns:
+            history_file.write(struct.pack(f"<{len(column)}q", *(timestamp for timestamp, _ in column)))
+        for column in columns:
+            history_file.write(struct.pack(f"<{len(column)}q", *(_scaled(rate, rate_scale) for _, rate in column)))
+
+
+def _scaled(rate: Decimal, rate_scale: int) -> int:
+    scaled = Decimal(rate).scaleb(rate_scale)
+    if scaled != scaled.to_integral_value():
+        raise ValueError(f"Rate {rate} has more than {rate_scale} decimal places")
+    return int(scaled)
+
+
+class RateHistory:
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as history_file:
+            self._mapped = mmap.mmap(history_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, currency_count, self.rate_scale, record_count, _ = HEADER.unpack_from(self._mapped)
+        if magic != MAGIC:
+            self._mapped.close()
+            raise ValueError(f"{path} is not a rate history file")
+
+        position = HEADER.size
+        self._ids = {CODE.unpack_from(self._mapped, position + CODE.size * index)[0].rstrip(b"\0").decode("ascii"):
+                     index for index in range(currency_count)}
+        position += CODE.size * currency_count
+        view = memoryview(self._mapped)
+        self._offsets = view[position:position + 8 * (currency_count + 1)].cast("q")
+        position += 8 * (currency_count + 1)
+        self._timestamps = view[position:position + 8 * record_count].cast("q")
+        position += 8 * record_count
+        self._rates = view[position:position + 8 * record_count].cast("q")
+        view.release()
+
+    def rate(self, currency: str, at: Optional[Timestamp] = None) -> Decimal:
+        """
+        The rate in effect at `at`, i.e. the latest rate at or before it; the
+        most recent rate when `at` is None.
+        """
+        try:
+            currency_id = self._ids[currency]
+        except KeyError:
+            raise Exception(f"Rate for {currency} not found") from None
+        start, end = self._offsets[currency_id], self._offsets[currency_id + 1]
+        if at is None:
+            index = end - 1
+        else:
+            index = bisect.bisect_right(self._timestamps, _epoch(at), start, end) - 1
+        if index < start:
+            raise Exception(f"Rate for {currency} at {at} not found")
+        return Decimal(self._rates[index]).scaleb(-self.rate_scale)
+
+    def close(self) -> None:
+        for view in (self._offsets, self._timestamps, self._rates):
+            view.release()
+        self._mapped.close()
+
+    def __enter__(self) -> RateHistory:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _epoch(at: Timestamp) -> int:
+    return int(at.timestamp()) if isinstance(at, datetime) else int(at)
+
+
+class HistoricalFXConverter(CurrencyConverterInterface):
+    def __init__(self, rate_history: RateHistory) -> None:
+        self.rate_history = rate_history
+
+    def convert(self, amount: Decimal, from_currency: str, to_currency: str,
+                at: Optional[Timestamp] = None) -> Decimal:
+        if from_currency == to_currency:
+            return amount
+
+        from_rate = self.rate_history.rate(from_currency, at)
+        to_rate = self.rate_history.rate(to_currency, at)
+
+        return amount * (to_rate / from_rate)
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        history_path = os.path.join(directory, "rates.fxh")
+        write_history(history_path, {
+            "USD": [(1_577_836_800, Decimal(1))],
+            "EUR": [(1_577_836_800, Decimal("0.89")), (1_609_459_200, Decimal("0.82")),
+                    (1_640_995_200, Decimal("0.88"))],
+        })
+        with RateHistory(history_path) as history:
+            converter = HistoricalFXConverter(history)
+            for at in (datetime(2020, 6, 1), datetime(2021, 6, 1), None):
+                print(f"100 USD in EUR at {at or 'latest'}: {converter.convert(Decimal(100), 'USD', 'EUR', at)}")
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+"""
+Versioned, immutable rate snapshots for converters shared by many threads.
+
+Assigning new rates to `FXConverter.fx_rates` while other threads convert lets
+readers see the new rates next to the old table. Here the rates and their
+RateTable live together in an immutable RateSnapshot. An update builds a
+complete new snapshot off to the side (copy-on-write), deriving its table from
+the previous one so that only the cross rates of the changed currencies are
+computed, and then publishes it with a single reference assignment, which is
+atomic. Readers never take a lock: they grab the current snapshot once and use
+it for the whole conversion or batch, so a batch never mixes two versions.
+An old snapshot is freed as soon as the last reader holding it lets go.
+"""
+
+import time
+from decimal import Decimal
+from threading import Lock, Thread
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from weakref import WeakValueDictionary
+
+from dependency_inversion_currency_converter import FXConverter, FXRate, RateTable
+
+
+class RateSnapshot:
+    """
+    One consistent version of the rates. Never modified after creation.
+    """
+
+    __slots__ = ("version", "fx_rates", "rate_table", "__weakref__")
+
+    def __init__(self, version: int, fx_rates: Iterable[FXRate], rate_table: Optional[RateTable] = None) -> None:
+        self.version = version
+        self.fx_rates: Tuple[FXRate, ...] = tuple(fx_rates)
+        self.rate_table = RateTable(self.fx_rates) if rate_table is None else rate_table
+
+    def convert(self, amount: Decimal, from_currency: str, to_currency: str) -> Decimal:
+        return self.rate_table.convert(amount, from_currency, to_currency)
+
+    def convert_many(self, amounts, from_currencies: Sequence[str], to_currencies: Sequence[str]):
+        return self.rate_table.convert_many(amounts, from_currencies, to_currencies)
+
+
+class VersionedFXConverter(FXConverter):
+    """
+    An FXConverter whose rates can be replaced while other threads convert.
+    Writers only serialize among themselves; reads never wait for them.
+    """
+
+    def __init__(self, fx_rates: List[FXRate]) -> None:
+        self._write_lock = Lock()
+        self._live: WeakValueDictionary = WeakValueDictionary()
+        self._snapshot = None
+        super().__init__(fx_rates)
+
+    @property
+    def fx_rates(self) -> Tuple[FXRate, ...]:
+        return self._snapshot.fx_rates
+
+    @fx_rates.setter
+    def fx_rates(self, fx_rates: Iterable[FXRate]) -> None:
+        with self._write_lock:
+            self._publish(fx_rates)
+
+    def update_rates(self, rates: Dict[str, Decimal]) -> int:
+        """
+        Copy-on-write update of some currencies; currencies that are not known
+        yet are added. Returns the new version.
+        """
+        with self._write_lock:
+            current = self._snapshot.fx_rates
+            current_table = self._snapshot.rate_table
+            known = {rate.currency for rate in current}
+            updated = [FXRate(rate.currency, rates[rate.currency]) if rate.currency in rates else rate
+                       for rate in current]
+            updated += [FXRate(currency, rate) for currency, rate in rates.items() if currency not in known]
+            return self._publish(updated, current_table.updated(rates)).version
+
+    def pin(self) -> RateSnapshot:
+        """
+        The current snapshot. Everything converted through it uses the same
+        version of the rates, however long the caller holds on to it.
+        """
+        return self._snapshot
+
+    def convert(self, amount: Decimal, from_currency: str, to_currency: str) -> Decimal:
+        return self._snapshot.convert(amount, from_currency, to_currency)
+
+    def convert_many(self, amounts, from_currencies: Sequence[str], to_currencies: Sequence[str]):
+        return self._snapshot.convert_many(amounts, from_currencies, to_currencies)
+
+    def live_versions(self) -> List[int]:
+        """
+        Versions still referenced by the converter or by a reader.
+        """
+        return sorted(self._live.keys())
+
+    def _publish(self, fx_rates: Iterable[FXRate], rate_table: Optional[RateTable] = None) -> RateSnapshot:
+        # The expensive part, building the table, happens before the swap.
+        version = 0 if self._snapshot is None else self._snapshot.version + 1
+        snapshot = RateSnapshot(version, fx_rates, rate_table)
+        self._live[version] = snapshot
+        self._snapshot = snapshot
+        return snapshot
+
+    def _get_rate(self, currency: str) -> Decimal:
+        return self._snapshot.rate_table.rate(currency)
+
+
+if __name__ == "__main__":
+    converter = VersionedFXConverter([FXRate('USD', Decimal(1)), FXRate('EUR', Decimal('0.9'))])
+    stop = False
+    torn_batches = 0
+
+    def reader() -> None:
+        global torn_batches
+        while not stop:
+            snapshot = converter.pin()
+            batch = snapshot.convert_many([Decimal(100)] * 100, ['USD'] * 100, ['EUR'] * 100)
+            if len(set(batch)) != 1:
+                torn_batches += 1
+
+    readers = [Thread(target=reader) for _ in range(4)]
+    for reader_thread in readers:
+        reader_thread.start()
+    for step in range(200):
+        converter.update_rates({'EUR': Decimal('0.9') + Decimal(step) / 1000})
+    time.sleep(0.05)
+    stop = True
+    for reader_thread in readers:
+        reader_thread.join()
+
+    print(f"Current version: {converter.pin().version}, torn batches: {torn_batches}")
+    print(f"100 USD = {converter.convert(Decimal(100), 'USD', 'EUR')} EUR")
+    print(f"Versions still alive: {converter.live_versions()}")
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+"""
+Streaming conversion of large transaction files with any CurrencyConverterInterface.
+
+The App only depends on the converter abstraction, so the same pipeline works for
+FXConverter, AplhaCurrency or any faster backend. Files are never loaded as a
+whole: rows are read, converted with `convert_many` and written in chunks, so
+memory stays bounded by the chunk size. With several workers, the file is split
+into byte ranges that are converted by separate processes into part files, which
+are then concatenated in order, so the output order matches the input.
+
+Two formats are supported:
+- CSV with a header and amount, from and to columns (no newlines inside fields);
+  a column with the converted amount is appended.
+- Fixed-size binary records `<q3s3s`: amount in minor units (e.g. cents) as
+  int64, from and to currency codes. Output records are `<q3s`: converted
+  amount in minor units and currency. Input files are memory-mapped. With NumPy
+  and a converter that `supports_fixed_point`, the records are converted as
+  int64 arrays; otherwise as Decimals, rounded half-even to the minor unit.
+"""
+
+import csv
+import io
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from decimal import ROUND_HALF_EVEN, Decimal
+from typing import Callable, List, Sequence, Tuple
+
+from dependency_inversion_currency_converter import CurrencyConverterInterface, FXConverter, FXRate, np
+
+INPUT_RECORD = struct.Struct("<q3s3s")
+OUTPUT_RECORD = struct.Struct("<q3s")
+
+
+def convert_csv(converter: CurrencyConverterInterface, input_path: str, output_path: str,
+                workers: int = 1, chunk_rows: int = 65536, amount_column: str = "amount",
+                from_column: str = "from_currency", to_column: str = "to_currency",
+                result_column: str = "converted") -> None:
+    with open(input_path, "rb") as input_file:
+        header_line = input_file.readline()
+        data_start = input_file.tell()
+    header = next(csv.reader([header_line.decode("utf-8")]))
+    columns = (header.index(amount_column), header.index(from_column), header.index(to_column))
+
+    with open(output_path, "w", encoding="utf-8", newline="") as output_file:
+        csv.writer(output_file).writerow(header + [result_column])
+
+    _run_ranges(_convert_csv_range, converter, input_path, output_path, data_start, os.path.getsize(input_path),
+                1, workers, (chunk_rows, columns))
+
+
+def convert_binary(converter: CurrencyConverterInterface, input_path: str, output_path: str,
+                   workers: int = 1, chunk_records: int = 262144, scale: int = 2) -> None:
+    """
+    `scale` is the number of decimal places of the minor unit (2 for cents).
+    """
+    size = os.path.getsize(input_path)
+    if size % INPUT_RECORD.size:
+        raise ValueError(f"{input_path} is not a whole number of {INPUT_RECORD.size} byte records")
+    open(output_path, "wb").close()
+    _run_ranges(_convert_binary_range, converter, input_path, output_path, 0, size, INPUT_RECORD.size, workers,
+                (chunk_records, scale))
+
+
+def _run_ranges(convert_range: Callable, converter: CurrencyConverterInterface, input_path: str, output_path: str,
+                start: int, end: int, alignment: int, workers: int, options: Tuple) -> None:
+    """
+    Split [start, end) into one byte range per worker, convert the ranges in
+    parallel into part files and append the parts to the output in order.
+    """
+    if workers <= 1 or end - start < workers * alignment:
+        with open(output_path, "ab") as output_file:
+            convert_range(converter, input_path, output_file, start, end, *options)
+        return
+
+    step = (end - start) // workers // alignment * alignment
+    bounds = [start + step * index for index in range(workers)] + [end]
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    part_paths: List[str] = []
+    try:
+        for _ in range(workers):
+            handle, part_path = tempfile.mkstemp(suffix=".part", dir=output_dir)
+            os.close(handle)
+            part_paths.append(part_path)
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(_convert_range_to_file, convert_range, converter, input_path, part_path,
+                                       bounds[index], bounds[index + 1], options)
+                       for index, part_path in enumerate(part_paths)]
+            for future in futures:
+                future.result()
+        with open(output_path, "ab") as output_file:
+            for part_path in part_paths:
+                with open(part_path, "rb") as part_file:
+                    shutil.copyfileobj(part_file, output_file, 1 << 20)
+    finally:
+        for part_path in part_paths:
+            os.remove(part_path)
+
+
+def _convert_range_to_file(convert_range: Callable, converter: CurrencyConverterInterface, input_path: str,
+                           part_path: str, start: int, end: int, options: Tuple) -> None:
+    with open(part_path, "wb") as part_file:
+        convert_range(converter, input_path, part_file, start, end, *options)
+
+
+def _convert_csv_range(converter: CurrencyConverterInterface, input_path: str, output_file, start: int, end: int,
+                       chunk_rows: int, columns: Tuple[int, int, int]) -> None:
+    """
+    A line belongs to the range it starts in: a range that begins in the
+    middle of a line skips it, and the last line may end after `end`.
+    """
+    amount_index, from_index, to_index = columns
+    writer_buffer = io.TextIOWrapper(output_file, encoding="utf-8", newline="", write_through=True)
+    writer = csv.writer(writer_buffer)
+    with open(input_path, "rb") as input_file:
+        input_file.seek(max(start - 1, 0))
+        if start > 0 and input_file.read(1) != b"\n":
+            input_file.readline()
+
+        rows: List[List[str]] = []
+        while input_file.tell() < end:
+            line = input_file.readline()
+            if not line:
+                break
+            if line.strip():
+                rows.append(next(csv.reader([line.decode("utf-8")])))
+            if len(rows) >= chunk_rows:
+                _write_csv_chunk(converter, writer, rows, amount_index, from_index, to_index)
+                rows = []
+        if rows:
+            _write_csv_chunk(converter, writer, rows, amount_index, from_index, to_index)
+    writer_buffer.detach()
+
+
+def _write_csv_chunk(converter: CurrencyConverterInterface, writer, rows: List[List[str]], amount_index: int,
+                     from_index: int, to_index: int) -> None:
+    converted = converter.convert_many([Decimal(row[amount_index]) for row in rows],
+                                       [row[from_index] for row in rows], [row[to_index] for row in rows])
+    for row, amount in zip(rows, converted):
+        row.append(str(amount))
+    writer.writerows(rows)
+
+
+def _convert_binary_range(converter: CurrencyConverterInterface, input_path: str, output_file, start: int,
+                          end: int, chunk_records: int, scale: int) -> None:
+    if start == end:
+        return
+    with open(input_path, "rb") as input_file, \
+            mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        chunk_bytes = chunk_records * INPUT_RECORD.size
+        for offset in range(start, end, chunk_bytes):
+            count = (min(offset + chunk_bytes, end) - offset) // INPUT_RECORD.size
+            if np is not None and converter.supports_fixed_point:
+                output_file.write(_convert_records_numpy(converter, mapped, offset, count))
+            else:
+                output_file.write(_convert_records(converter, mapped[offset:offset + count * INPUT_RECORD.size],
+                                                   scale))
+
+
+def _convert_records_numpy(converter: CurrencyConverterInterface, mapped: mmap.mmap, offset: int,
+                           count: int) -> bytes:
+    records = np.frombuffer(mapped, dtype=np.dtype([("amount", "<i8"), ("from", "S3"), ("to", "S3")]),
+                            count=count, offset=offset)
+    to_codes = records["to"]
+    converted = converter.convert_many(records["amount"].copy(), records["from"].astype("U3"),
+                                       to_codes.astype("U3"))
+    output = np.empty(count, dtype=np.dtype([("amount", "<i8"), ("currency", "S3")]))
+    output["amount"] = converted
+    output["currency"] = to_codes
+    return output.tobytes()
+
+
+def _convert_records(converter: CurrencyConverterInterface, data: bytes, scale: int) -> bytes:
+    """
+    Pure Python fallback with the same rounding as the NumPy fixed-point path.
+    """
+    records = list(INPUT_RECORD.iter_unpack(data))
+    to_codes = [to_code.decode("ascii") for _, _, to_code in records]
+    converted = converter.convert_many([Decimal(amount).scaleb(-scale) for amount, _, _ in records],
+                                       [from_code.decode("ascii") for _, from_code, _ in records], to_codes)
+    unit = Decimal(1).scaleb(-scale)
+    return b"".join(OUTPUT_RECORD.pack(int(amount.quantize(unit, ROUND_HALF_EVEN).scaleb(scale)), code.encode("ascii"))
+                    for amount, code in zip(converted, to_codes))
+
+
+def write_binary_records(path: str, records: Sequence[Tuple[int, str, str]]) -> None:
+    with open(path, "wb") as output_file:
+        for amount, from_currency, to_currency in records:
+            output_file.write(INPUT_RECORD.pack(amount, from_currency.encode("ascii"), to_currency.encode("ascii")))
+
+
+if __name__ == "__main__":
+    fx_converter = FXConverter([
+        FXRate('USD', Decimal(1)),
+        FXRate('EUR', Decimal('0.9')),
+        FXRate('GBP', Decimal('0.8')),
+    ])
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "transactions.csv")
+        with open(csv_path, "w", encoding="utf-8", newline="") as transactions:
+            transactions.write("id,amount,from_currency,to_currency\n")
+            for transaction_id in range(10):
+                transactions.write(f"{transaction_id},{transaction_id * 10}.50,USD,{('EUR', 'GBP')[transaction_id % 2]}\n")
+        convert_csv(fx_converter, csv_path, csv_path + ".out", workers=2, chunk_rows=4)
+        with open(csv_path + ".out", encoding="utf-8") as converted_file:
+            print(converted_file.read())
+
+        binary_path = os.path.join(directory, "transactions.bin")
+        write_binary_records(binary_path, [(1050, "USD", "EUR"), (2000, "GBP", "USD"), (999, "EUR", "GBP")])
+        convert_binary(fx_converter, binary_path, binary_path + ".out", workers=2)
+        with open(binary_path + ".out", "rb") as converted_file:
+            print(list(OUTPUT_RECORD.iter_unpack(converted_file.read())))
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+"""
+Asynchronous device drivers for switches.
+
+Real devices answer over the network in 50-500 ms, so a PowerSwitch that blocks
+on every `turn_on` takes hours for ten thousand devices. Here the switchable
+abstraction is async: AsyncPowerSwitch awaits the device, and `press_all` presses
+many switches concurrently. A CommandScheduler shared by the switches bounds the
+number of commands in flight, globally and per device, and retries failed
+commands with exponential backoff and full jitter so that devices recovering
+from an outage are not hit by synchronized retry waves.
+
+SimulatedDeviceServer is a local TCP server that behaves like a gateway of slow,
+occasionally failing devices, for tests and for the demo below.
+"""
+
+import asyncio
+import random
+import time
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple, Type
+from weakref import WeakKeyDictionary
+
+from dependency_inversion_lightbulb_powerswitch2 import ISwitchable, LightBulb
+
+try:
+    import resource
+except ImportError:  # Only available on Unix.
+    resource = None
+
+
+class IAsyncSwitchable(ABC):
+    @abstractmethod
+    async def turn_on(self) -> None:
+        pass
+
+    @abstractmethod
+    async def turn_off(self) -> None:
+        pass
+
+
+class AsyncSwitchableAdapter(IAsyncSwitchable):
+    """
+    Drives a blocking ISwitchable from a worker thread, so existing devices can
+    be used with AsyncPowerSwitch.
+    """
+
+    def __init__(self, switchable_instance: ISwitchable) -> None:
+        self.switchable_obj = switchable_instance
+
+    async def turn_on(self) -> None:
+        await asyncio.to_thread(self.switchable_obj.turn_on)
+
+    async def turn_off(self) -> None:
+        await asyncio.to_thread(self.switchable_obj.turn_off)
+
+
+class CommandScheduler:
+    """
+    Runs device commands with at most `max_concurrency` in flight overall and
+    `max_per_device` per device. A command failing with one of `retry_on` is
+    retried up to `attempts` times in total, after a random delay between 0 and
+    min(`max_delay`, `base_delay` * 2 ** retry). By default that is any
+    OSError, which covers refused connections and running out of sockets, and
+    timeouts.
+    """
+
+    def __init__(self, max_concurrency: int = 100, max_per_device: int = 1, attempts: int = 3,
+                 base_delay: float = 0.05, max_delay: float = 2.0, timeout: Optional[float] = None,
+                 retry_on: Tuple[Type[BaseException], ...] = (OSError, asyncio.TimeoutError)) -> None:
+        self.max_per_device = max_per_device
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.retry_on = retry_on
+        self.retries = 0
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._devices: WeakKeyDictionary = WeakKeyDictionary()
+
+    async def run(self, device: IAsyncSwitchable, command: Callable[[], Awaitable[None]]) -> None:
+        device_limit = self._devices.get(device)
+        if device_limit is None:
+            device_limit = self._devices[device] = asyncio.Semaphore(self.max_per_device)
+
+        for attempt in range(self.attempts):
+            try:
+                # The device slot is taken first, so a busy device doesn't hold a global slot.
+                async with device_limit, self._global:
+                    await asyncio.wait_for(command(), self.timeout)
+                return
+            except self.retry_on:
+                if attempt == self.attempts - 1:
+                    raise
+            self.retries += 1
+            await asyncio.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+
+
+class AsyncPowerSwitch:
+    """
+    The async counterpart of PowerSwitch. The state only changes once the
+    device has confirmed the command. Presses of the same switch take turns,
+    so each one acts on the state the previous one left.
+    """
+
+    def __init__(self, switchable_instance: IAsyncSwitchable, scheduler: Optional[CommandScheduler] = None) -> None:
+        self.switchable_obj = switchable_instance
+        self.scheduler = scheduler
+        self.on = False
+        self._pressing = asyncio.Lock()
+
+    async def press(self) -> None:
+        async with self._pressing:
+            target = not self.on
+            command = self.switchable_obj.turn_on if target else self.switchable_obj.turn_off
+            if self.scheduler is None:
+                await command()
+            else:
+                await self.scheduler.run(self.switchable_obj, command)
+            self.on = target
+
+
+async def press_all(switches: Sequence[AsyncPowerSwitch]) -> List[Optional[BaseException]]:
+    """
+    Press every switch concurrently. Returns, per switch, None or the error of
+    the command that failed for good; one failing device doesn't stop the others.
+    """
+    results = await asyncio.gather(*(switch.press() for switch in switches), return_exceptions=True)
+    return [result if isinstance(result, BaseException) else None for result in results]
+
+
+class SimulatedDeviceServer:
+    """
+    Accepts one command per connection, `ON <device>` or `OFF <device>`, and
+    answers `OK` after `latency` seconds (a (min, max) range). A share
+    `failure_rate` of the commands fails by closing the connection unanswered.
+    """
+
+    def __init__(self, latency: Tuple[float, float] = (0.05, 0.5), failure_rate: float = 0.0) -> None:
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.commands = 0
+        self.states = {}
+        self.port: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> SimulatedDeviceServer:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0, backlog=4096)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def __aenter__(self) -> SimulatedDeviceServer:
+        return await self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            action, device = (await reader.readline()).decode("ascii").split()
+            await asyncio.sleep(random.uniform(*self.latency))
+            self.commands += 1
+            if random.random() >= self.failure_rate:
+                self.states[device] = action == "ON"
+                writer.write(b"OK\n")
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+class NetworkLightBulb(IAsyncSwitchable):
+    """
+    A bulb reached over TCP, e.g. through a SimulatedDeviceServer.
+    """
+
+    def __init__(self, device_id: str, host: str, port: int) -> None:
+        self.device_id = device_id
+        self.host = host
+        self.port = port
+
+    async def turn_on(self) -> None:
+        await self._send("ON")
+
+    async def turn_off(self) -> None:
+        await self._send("OFF")
+
+    async def _send(self, action: str) -> None:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(f"{action} {self.device_id}\n".encode("ascii"))
+            await writer.drain()
+            if await reader.readline() != b"OK\n":
+                raise ConnectionError(f"{self.device_id}: {action} not acknowledged")
+        finally:
+            writer.close()
+
+
+def connection_limit(default: int, reserved: int = 64) -> int:
+    """
+    How many connections to a server in the same process fit into the open
+    file limit: each one takes a descriptor on both ends, and `reserved` are
+    left for everything else.
+    """
+    if resource is None:
+        return default
+    soft_limit, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft_limit == resource.RLIM_INFINITY:
+        return default
+    return max(1, min(default, (soft_limit - reserved) // 2))
+
+
+async def main() -> None:
+    # an existing blocking device behind the async interface
+    await AsyncPowerSwitch(AsyncSwitchableAdapter(LightBulb())).press()
+
+    async with SimulatedDeviceServer(latency=(0.05, 0.5), failure_rate=0.02) as server:
+        scheduler = CommandScheduler(max_concurrency=connection_limit(1000), max_per_device=1, attempts=5, timeout=2.0)
+        switches = [AsyncPowerSwitch(NetworkLightBulb(f"bulb-{index}", "127.0.0.1", server.port), scheduler)
+                    for index in range(10_000)]
+        start = time.perf_counter()
+        errors = await press_all(switches)
+        elapsed = time.perf_counter() - start
+
+    print(f"Switched {sum(switch.on for switch in switches)} of {len(switches)} devices on in {elapsed:.1f} s")
+    print(f"Retries: {scheduler.retries}, failed for good: {sum(error is not None for error in errors)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
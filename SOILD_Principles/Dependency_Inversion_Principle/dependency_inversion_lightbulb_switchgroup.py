@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+"""
+A SwitchGroup controls many ISwitchable devices at once.
+
+PowerSwitch keeps one bool per switch and talks to one device. For hundreds of
+thousands of devices the on/off state of the whole group is kept in a single
+bitset instead, a Python int where bit i is the state of device i. Pressing,
+setting or toggling any selection of devices (a whole building, a floor given as
+an ID range, an arbitrary mask) is one bitwise operation on that int.
+
+Only the devices whose state actually changed are told about it, grouped by
+device type: a type implementing IBatchSwitchable gets one `turn_on_many` /
+`turn_off_many` call per operation, any other ISwitchable is switched one by one.
+"""
+
+from abc import abstractmethod
+from typing import Dict, Iterable, List, Sequence, Union
+
+from dependency_inversion_lightbulb_powerswitch2 import Fan, ISwitchable, LightBulb
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+Selection = Union[None, int, range, Iterable[int]]
+
+# The positions of the set bits of every byte value, for the pure Python path.
+_BYTE_BITS = [[bit for bit in range(8) if value >> bit & 1] for value in range(256)]
+
+
+class IBatchSwitchable(ISwitchable):
+    """
+    A device type that can switch many of its devices in one call, e.g. with a
+    single message to the gateway they are connected to.
+    """
+
+    @classmethod
+    @abstractmethod
+    def turn_on_many(cls, devices: Sequence[ISwitchable]) -> None:
+        pass
+
+    @classmethod
+    @abstractmethod
+    def turn_off_many(cls, devices: Sequence[ISwitchable]) -> None:
+        pass
+
+
+class SwitchGroup:
+    """
+    Switches for a group of devices; the device ID is its index in the group.
+
+    A selection is None for every device, a range of IDs, an int bitmask (bit i
+    selects device i) or an iterable of IDs.
+    """
+
+    def __init__(self, devices: Iterable[ISwitchable] = ()) -> None:
+        self.devices: List[ISwitchable] = list(devices)
+        self._state = 0
+        self._type_masks: Dict[type, int] = {}
+        type_bits: Dict[type, bytearray] = {}
+        size = (len(self.devices) + 7) // 8
+        for device_id, device in enumerate(self.devices):
+            bits = type_bits.get(type(device))
+            if bits is None:
+                bits = type_bits[type(device)] = bytearray(size)
+            bits[device_id >> 3] |= 1 << (device_id & 7)
+        for device_type, bits in type_bits.items():
+            self._type_masks[device_type] = int.from_bytes(bits, "little")
+
+    def __len__(self) -> int:
+        return len(self.devices)
+
+    def add(self, device: ISwitchable) -> int:
+        device_id = len(self.devices)
+        self.devices.append(device)
+        self._type_masks[type(device)] = self._type_masks.get(type(device), 0) | 1 << device_id
+        return device_id
+
+    @property
+    def all_mask(self) -> int:
+        return (1 << len(self.devices)) - 1
+
+    def mask(self, selection: Selection) -> int:
+        if selection is None:
+            return self.all_mask
+        if isinstance(selection, int):
+            return selection & self.all_mask
+        if isinstance(selection, range) and selection.step == 1:
+            start, stop = max(selection.start, 0), min(selection.stop, len(self.devices))
+            return ((1 << max(stop - start, 0)) - 1) << start
+        bits = bytearray((len(self.devices) + 7) // 8)
+        for device_id in selection:
+            if not 0 <= device_id < len(self.devices):
+                raise IndexError(f"Device {device_id} not in the group")
+            bits[device_id >> 3] |= 1 << (device_id & 7)
+        return int.from_bytes(bits, "little")
+
+    def is_on(self, device_id: int) -> bool:
+        return bool(self._state >> device_id & 1)
+
+    def count_on(self, selection: Selection = None) -> int:
+        return (self._state & self.mask(selection)).bit_count()
+
+    def on_ids(self, selection: Selection = None) -> Sequence[int]:
+        return _bit_indices(self._state & self.mask(selection), len(self.devices))
+
+    def to_bytes(self) -> bytes:
+        """
+        The packed state, one bit per device, little-endian.
+        """
+        return self._state.to_bytes((len(self.devices) + 7) // 8, "little")
+
+    def set(self, selection: Selection, on: bool) -> None:
+        selected = self.mask(selection)
+        self._apply(self._state | selected if on else self._state & ~selected)
+
+    def toggle(self, selection: Selection = None) -> None:
+        self._apply(self._state ^ self.mask(selection))
+
+    def press(self, selection: Selection = None) -> None:
+        """
+        Press the switch of every selected device, like PowerSwitch.press does
+        for a single one: devices that are on are turned off and vice versa.
+        """
+        self.toggle(selection)
+
+    def _apply(self, state: int) -> None:
+        changed = self._state ^ state
+        self._state = state
+        if changed:
+            self._dispatch(changed & state, "turn_on")
+            self._dispatch(changed & ~state, "turn_off")
+
+    def _dispatch(self, mask: int, action: str) -> None:
+        if not mask:
+            return
+        for device_type, type_mask in self._type_masks.items():
+            type_changed = mask & type_mask
+            if not type_changed:
+                continue
+            devices = [self.devices[device_id] for device_id in _bit_indices(type_changed, len(self.devices))]
+            if issubclass(device_type, IBatchSwitchable):
+                getattr(device_type, f"{action}_many")(devices)
+            else:
+                for device in devices:
+                    getattr(device, action)()
+
+
+def _bit_indices(mask: int, size: int) -> Sequence[int]:
+    data = mask.to_bytes((size + 7) // 8, "little")
+    if np is not None:
+        return np.flatnonzero(np.unpackbits(np.frombuffer(data, dtype=np.uint8), bitorder="little")).tolist()
+    return [offset * 8 + bit for offset, value in enumerate(data) if value for bit in _BYTE_BITS[value]]
+
+
+class SmartBulb(IBatchSwitchable):
+    """
+    A bulb behind a gateway that accepts a whole list of bulbs per command.
+    """
+    commands = 0
+
+    def __init__(self) -> None:
+        self.lit = False
+
+    def turn_on(self) -> None:
+        self.turn_on_many([self])
+
+    def turn_off(self) -> None:
+        self.turn_off_many([self])
+
+    @classmethod
+    def turn_on_many(cls, devices: Sequence[SmartBulb]) -> None:
+        cls.commands += 1
+        for device in devices:
+            device.lit = True
+
+    @classmethod
+    def turn_off_many(cls, devices: Sequence[SmartBulb]) -> None:
+        cls.commands += 1
+        for device in devices:
+            device.lit = False
+
+
+if __name__ == "__main__":
+    # a small room with devices that are switched one by one
+    room = SwitchGroup([LightBulb(), Fan(), LightBulb()])
+    room.press()
+    room.set(range(1, 2), False)
+    print(f"Room devices on: {room.on_ids()}\n")
+
+    # a building with 200,000 bulbs on 20 floors of 10,000 bulbs each
+    building = SwitchGroup(SmartBulb() for _ in range(200_000))
+    building.toggle()
+    building.set(range(30_000, 40_000), False)
+    building.toggle(building.mask(range(0, 200_000, 2)))
+    print(f"Bulbs on: {building.count_on()}, on the 4th floor: {building.count_on(range(30_000, 40_000))}")
+    print(f"Gateway commands sent: {SmartBulb.commands}")
@@ -0,0 +1,52 @@
+"""
+Parity of the NumPy fixed-point bulk conversion with the scalar Decimal one.
+
+    python -m unittest test_dependency_inversion_currency_converter
+"""
+
+import random
+import unittest
+from decimal import ROUND_HALF_EVEN, Decimal
+
+from dependency_inversion_currency_converter import FXRate, RateTable, np
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class FixedPointParityTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.generator = random.Random(0)
+        # Rates over many orders of magnitude, so that cross rates range from
+        # about 1e-9 to 1e9 and small ones have few digits before the point.
+        self.rates = [FXRate(f"C{index:02d}", Decimal(self.generator.randint(1, 10 ** 8)).scaleb(
+            -self.generator.randint(0, 8))) for index in range(40)]
+
+    def assert_parity(self, table: RateTable, rows: int = 20_000) -> None:
+        from_currencies = [self.generator.choice(table.codes) for _ in range(rows)]
+        to_currencies = [self.generator.choice(table.codes) for _ in range(rows)]
+        amounts = []
+        for from_currency, to_currency in zip(from_currencies, to_currencies):
+            # Large amounts, as long as the converted amount fits into int64.
+            limit = int(min(Decimal(10 ** 17), Decimal(10 ** 18) / max(table.cross_rate(from_currency, to_currency),
+                                                                        Decimal(1))))
+            amounts.append(self.generator.randint(-limit, limit) // 10 ** self.generator.randint(0, 15))
+
+        fixed = table.convert_many_fixed(np.array(amounts, dtype=np.int64), from_currencies, to_currencies)
+        for amount, from_currency, to_currency, converted in zip(amounts, from_currencies, to_currencies,
+                                                                  fixed.tolist()):
+            scalar = table.convert(Decimal(amount), from_currency, to_currency).quantize(Decimal(1), ROUND_HALF_EVEN)
+            self.assertEqual(converted, int(scalar), (amount, from_currency, to_currency))
+
+    def test_matrix(self) -> None:
+        self.assert_parity(RateTable(self.rates))
+
+    def test_without_matrix(self) -> None:
+        self.assert_parity(RateTable(self.rates, matrix_limit=0))
+
+    def test_ties_round_half_even(self) -> None:
+        table = RateTable([FXRate("USD", Decimal(1)), FXRate("EUR", Decimal("0.5"))])
+        fixed = table.convert_many_fixed(np.array([1, 3, -1, -3], dtype=np.int64), ["USD"] * 4, ["EUR"] * 4)
+        self.assertEqual(fixed.tolist(), [0, 2, 0, -2])
+
+
+if __name__ == "__main__":
+    unittest.main()
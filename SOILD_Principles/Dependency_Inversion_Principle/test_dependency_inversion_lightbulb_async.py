@@ -0,0 +1,95 @@
+"""
+The async switches against the simulated device server.
+
+    python -m unittest test_dependency_inversion_lightbulb_async
+"""
+
+import asyncio
+import random
+import unittest
+
+from dependency_inversion_lightbulb_async import (AsyncPowerSwitch, CommandScheduler, IAsyncSwitchable,
+                                                  NetworkLightBulb, SimulatedDeviceServer, press_all)
+
+
+class CountingDevice(IAsyncSwitchable):
+    """
+    Records how many commands are in flight, overall and for this device.
+    """
+
+    in_flight = 0
+    max_in_flight = 0
+
+    def __init__(self) -> None:
+        self.in_flight_here = 0
+        self.max_in_flight_here = 0
+
+    async def turn_on(self) -> None:
+        await self._command()
+
+    async def turn_off(self) -> None:
+        await self._command()
+
+    async def _command(self) -> None:
+        CountingDevice.in_flight += 1
+        self.in_flight_here += 1
+        CountingDevice.max_in_flight = max(CountingDevice.max_in_flight, CountingDevice.in_flight)
+        self.max_in_flight_here = max(self.max_in_flight_here, self.in_flight_here)
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            CountingDevice.in_flight -= 1
+            self.in_flight_here -= 1
+
+
+class AsyncSwitchTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        random.seed(0)
+
+    async def test_failed_commands_are_retried(self) -> None:
+        async with SimulatedDeviceServer(latency=(0.001, 0.01), failure_rate=0.3) as server:
+            scheduler = CommandScheduler(max_concurrency=50, attempts=10, base_delay=0.001, timeout=2.0)
+            switches = [AsyncPowerSwitch(NetworkLightBulb(f"bulb-{index}", "127.0.0.1", server.port), scheduler)
+                        for index in range(100)]
+            errors = await press_all(switches)
+
+        self.assertEqual(errors, [None] * len(switches))
+        self.assertTrue(all(switch.on for switch in switches))
+        self.assertEqual(server.states, {f"bulb-{index}": True for index in range(100)})
+        self.assertGreater(scheduler.retries, 0)
+        self.assertEqual(server.commands, len(switches) + scheduler.retries)
+
+    async def test_commands_failing_for_good_are_reported(self) -> None:
+        async with SimulatedDeviceServer(latency=(0.001, 0.002), failure_rate=1.0) as server:
+            scheduler = CommandScheduler(attempts=3, base_delay=0.001)
+            switch = AsyncPowerSwitch(NetworkLightBulb("bulb", "127.0.0.1", server.port), scheduler)
+            errors = await press_all([switch])
+
+        self.assertIsInstance(errors[0], ConnectionError)
+        self.assertFalse(switch.on)
+        self.assertEqual(server.commands, 3)
+
+    async def test_concurrency_limits(self) -> None:
+        CountingDevice.in_flight = CountingDevice.max_in_flight = 0
+        scheduler = CommandScheduler(max_concurrency=5, max_per_device=2)
+        devices = [CountingDevice() for _ in range(4)]
+        # Several switches share every device.
+        switches = [AsyncPowerSwitch(devices[index % len(devices)], scheduler) for index in range(40)]
+        await press_all(switches)
+
+        self.assertEqual(CountingDevice.max_in_flight, 5)
+        self.assertEqual(max(device.max_in_flight_here for device in devices), 2)
+
+    async def test_concurrent_presses_of_one_switch(self) -> None:
+        async with SimulatedDeviceServer(latency=(0.001, 0.01)) as server:
+            switch = AsyncPowerSwitch(NetworkLightBulb("bulb", "127.0.0.1", server.port), CommandScheduler())
+            await asyncio.gather(switch.press(), switch.press())
+
+        # Pressed twice: turned on, then off again.
+        self.assertFalse(switch.on)
+        self.assertEqual(server.states, {"bulb": False})
+        self.assertEqual(server.commands, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()